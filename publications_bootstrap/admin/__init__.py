@@ -3,10 +3,12 @@
 from django.contrib import admin
 
 from .catalogadmin import CatalogAdmin
+from .importjobadmin import ImportJobAdmin
 from .publicationadmin import PublicationAdmin
 from .typeadmin import TypeAdmin
-from ..models import Type, Catalog, Publication
+from ..models import Type, Catalog, ImportJob, Publication
 
 admin.site.register(Type, TypeAdmin)
 admin.site.register(Catalog, CatalogAdmin)
 admin.site.register(Publication, PublicationAdmin)
+admin.site.register(ImportJob, ImportJobAdmin)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+from django.contrib import admin
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('file', 'user', 'status', 'created', 'finished', 'parsed', 'saved', 'updated', 'skipped',
+                    'error_count')
+    list_filter = ('status',)
+    readonly_fields = ('file', 'user', 'status', 'created', 'started', 'heartbeat', 'finished', 'parsed', 'saved',
+                       'updated', 'skipped', 'error_count', 'errors')
+
+    def has_add_permission(self, request):
+        # imports are queued from the publications
+        return False
@@ -5,6 +5,7 @@ from distutils.version import StrictVersion
 import django
 from django import forms
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.translation import ugettext_lazy as _
 
 from django.conf.urls import url
@@ -46,11 +47,29 @@ class PublicationAdminForm(forms.ModelForm):
             self.fields[field].widget.attrs['class'] = 'vIntegerField'
 
 
+class PossibleDuplicatesFilter(admin.SimpleListFilter):
+    """
+    Publications sharing their fingerprint with other publications, see `Publication.fingerprint`.
+    """
+    title = 'possible duplicates'
+    parameter_name = 'duplicates'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Yes'),)
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            fingerprints = Publication.objects.exclude(fingerprint='').order_by().values('fingerprint') \
+                .annotate(count=Count('pk')).filter(count__gt=1).values('fingerprint')
+            return queryset.filter(fingerprint__in=fingerprints)
+        return queryset
+
+
 class PublicationAdmin(admin.ModelAdmin):
     form = PublicationAdminForm
     list_display = ('type', 'first_author', 'title', 'type', 'year', 'journal_or_book_title', 'status',)
     list_display_links = ('title',)
-    list_filter = ('year', 'journal', 'status',)
+    list_filter = ('year', 'journal', 'status', PossibleDuplicatesFilter,)
     change_list_template = 'admin/publications_bootstrap/publication_change_list.html'
     search_fields = (
         'title', 'journal', 'book_title', 'authors', 'tags', 'year', 'institution', 'school', 'organization')
@@ -96,8 +115,15 @@ class PublicationAdmin(admin.ModelAdmin):
     )
     inlines = [PublicationLinkInline, PublicationFileInline, PublicationCatalogInline]
 
+    def get_ordering(self, request):
+        if request.GET.get(PossibleDuplicatesFilter.parameter_name):
+            # list the possible duplicates next to each other
+            return ('fingerprint',) + tuple(Publication._meta.ordering)
+        return super(PublicationAdmin, self).get_ordering(request)
+
     def get_urls(self):
         return [url(r'^import_bibtex/$', admin_views.import_bibtex, name='publications_publication_import_bibtex'),
+                url(r'^import_bibtex/(?P<pk>\d+)/$', admin_views.import_job, name='publications_publication_import_job'),
                 ] + super(PublicationAdmin, self).get_urls()
 
     def _set_status(self, request, queryset, new_status):
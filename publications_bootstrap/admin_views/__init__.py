@@ -1,3 +1,3 @@
 # -*- coding: utf-8 -*-
 
-from .import_bibtex import import_bibtex
+from .import_bibtex import import_bibtex, import_job
@@ -1,60 +1,72 @@
 # -*- coding: utf-8 -*-
 
-import re
-
-from django.template import RequestContext
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponseRedirect
-from django.shortcuts import render
-
-from django.db import transaction
+from django.core.files.base import ContentFile
+from django.http import HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404, render
+try:
+    from django.core.urlresolvers import reverse
+except ImportError:  # Django>=2.0
+    from django.urls import reverse
 
-from ..utils import import_bibtex as do_import_bibtex
-from ..models import Publication, Type
+from ..compat import is_authenticated
+from ..models import ImportJob, Type
 
 
 def import_bibtex(request):
     if request.method == 'POST':
-        # try to import BibTex
-        publications = parse_upload_bibtex(request)
+        # queue the BibTex for the import jobs worker
+        job = queue_upload_bibtex(request)
+        if job is None:
+            return get_response(request, errors=['Please provide a bibliography or a BibTex file.'])
 
-        # redirect to publication listing
-        return HttpResponseRedirect('../')
+        # follow the progress of the import
+        return HttpResponseRedirect(reverse('admin:publications_publication_import_job', args=[job.pk]))
     else:
         response = get_response(request)
         return response
 
-def get_response(request):
+def get_response(request, errors=None):
     response = render(request,
                   'admin/publications_bootstrap/import_bibtex.html',
                   {'title': 'Import BibTex',
                    'types': Type.objects.all(),
+                   'errors': errors,
                    'request': request},
                   )
     return response
 
-def parse_upload_bibtex(request):
-    bibtex = request.POST['bibliography']
+def queue_upload_bibtex(request):
+    # uploaded files are stored as they are, they are decompressed on the fly by the worker
+    upload = request.FILES.get('bibliography_file')
+    if upload is None:
+        bibliography = request.POST.get('bibliography', '')
+        if not bibliography.strip():
+            return None
+        upload = ContentFile(bibliography.encode('utf-8'), name='bibliography.bib')
 
-    with transaction.atomic():
-        publications, errors = do_import_bibtex(bibtex)
+    job = ImportJob(user=request.user if is_authenticated(request.user) else None)
+    job.file.save(upload.name, upload, save=False)
+    job.save()
 
-    status = messages.SUCCESS
-    if len(publications) == 0:
-        status = messages.ERROR
-        msg = 'No publications were added, %i errors occurred' % len(errors)
-    elif len(publications) > 1:
-        msg = 'Successfully added %i publications (%i skipped due to errors)' % (len(publications), len(errors))
-    else:
-        msg = 'Successfully added %i publication (%i error(s) occurred)' % (len(publications), len(errors))
+    messages.add_message(request, messages.INFO,
+                         'The import of "%s" was queued, publications are added as the file is processed' % upload.name)
+    return job
 
-    # show message
-    messages.add_message(request, status, msg)
+def import_job(request, pk):
+    job = get_object_or_404(ImportJob, pk=pk)
 
-    for error in errors:
-        messages.add_message(request, messages.ERROR, error)
+    # polled by the progress page
+    if request.GET.get('format') == 'json':
+        return JsonResponse(job.progress)
 
-    return publications
+    return render(request,
+                  'admin/publications_bootstrap/import_job.html',
+                  {'title': 'Import BibTex',
+                   'job': job,
+                   'request': request},
+                  )
 
 import_bibtex = staff_member_required(import_bibtex)
+import_job = staff_member_required(import_job)
@@ -9,8 +9,43 @@ class PublicationsBootstrapConfig(AppConfig):
     # TODO: check if dependencies are met
 
     defaults = {}
-    for param in ['bibliography', 'citation', 'marker', 'sorting']:
+    for param in ['bibliography', 'citation', 'marker', 'sorting', 'authors_cache_size', 'page_size',
+                  'page_cache', 'page_cache_timeout', 'page_cache_max_size', 'card_cache', 'tex_parse_cache_size',
+                  'import_batch_size', 'import_job_timeout', 'type_registry_timeout']:
         try:
             defaults[param] = getattr(settings, '{}_{}'.format(name.upper(), param.upper()))
         except AttributeError:
             pass
+
+    def ready(self):
+        from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+        from .models import Publication, Type, Catalog, PublicationLink, PublicationFile
+        from .signals import set_modified, set_citekey_lower, set_title_lower, touch_publication, touch_catalog_publications, invalidate_pages, \
+            invalidate_cards, clear_type_registry
+
+        for model in (Publication, Type, Catalog, PublicationLink, PublicationFile):
+            pre_save.connect(set_modified, sender=model, dispatch_uid='publications_bootstrap_set_modified')
+        pre_save.connect(set_citekey_lower, sender=Publication, dispatch_uid='publications_bootstrap_set_citekey_lower')
+        pre_save.connect(set_title_lower, sender=Catalog, dispatch_uid='publications_bootstrap_set_title_lower')
+        for model in (PublicationLink, PublicationFile):
+            post_save.connect(touch_publication, sender=model, dispatch_uid='publications_bootstrap_touch_publication')
+            post_delete.connect(touch_publication, sender=model, dispatch_uid='publications_bootstrap_touch_publication')
+        m2m_changed.connect(touch_catalog_publications, sender=Catalog.publications.through,
+                            dispatch_uid='publications_bootstrap_touch_catalog_publications')
+        for model in (Publication, Type, Catalog, PublicationLink, PublicationFile):
+            post_save.connect(invalidate_pages, sender=model, dispatch_uid='publications_bootstrap_invalidate_pages')
+            post_delete.connect(invalidate_pages, sender=model, dispatch_uid='publications_bootstrap_invalidate_pages')
+        m2m_changed.connect(invalidate_pages, sender=Catalog.publications.through,
+                            dispatch_uid='publications_bootstrap_invalidate_pages')
+        post_save.connect(invalidate_cards, sender=Type, dispatch_uid='publications_bootstrap_invalidate_cards')
+        post_delete.connect(invalidate_cards, sender=Type, dispatch_uid='publications_bootstrap_invalidate_cards')
+        # the types are reordered by saving them
+        post_save.connect(clear_type_registry, sender=Type, dispatch_uid='publications_bootstrap_clear_type_registry')
+        post_delete.connect(clear_type_registry, sender=Type, dispatch_uid='publications_bootstrap_clear_type_registry')
+
+        if 'django.contrib.sites' in settings.INSTALLED_APPS:
+            from django.contrib.sites.models import Site
+            from .signals import clear_rfr_id
+
+            post_save.connect(clear_rfr_id, sender=Site, dispatch_uid='publications_bootstrap_clear_rfr_id')
+            post_delete.connect(clear_rfr_id, sender=Site, dispatch_uid='publications_bootstrap_clear_rfr_id')
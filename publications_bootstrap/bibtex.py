@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import io
 import re
 
 from django.utils import six
@@ -42,6 +43,255 @@ special_chars = (
     (r'{\i}', 'ı'), (r'\.{I}', 'İ'), ('\\u{g}', 'ğ'), ('\\u{G}', 'Ğ'), (r'\c{s}', 'ş'),
     (r'\c{S}', 'Ş'))  # turkish
 
+# characters with a special meaning in LaTeX, unless already escaped
+latex_special_chars = re.compile(r'(?<!\\)([%&#])')
+
+
+def latex_escape(string):
+    """
+    Escapes the characters of a string with a special meaning in LaTeX, i.e. %, & and #, which are not yet escaped.
+
+    @type  string: string
+    @param string: value of a BibTex field
+
+    @rtype: string
+    @return: the escaped value
+    """
+    return latex_special_chars.sub(r'\\\1', string)
+
+
+def _trie_pattern(strings):
+    # alternatives sharing their prefixes, which are matched once
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def pattern(node):
+        optional = '' in node
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return '(?:{}){}'.format('|'.join(branches), '?' if optional else '')
+
+    return re.compile(pattern(trie))
+
+
+# no sequence is the prefix of another, the sequences are decoded in a single pass
+special_chars_map = dict(special_chars)
+special_chars_re = _trie_pattern(special_chars_map)
+latex_accents = re.compile(r'\\[cuHvs]{?([a-zA-Z])}?')
+
+entry_start = re.compile(r'(?u)@(\w+)[ \t]?{')
+# line starting an entry, which ends the current entry if its braces are not balanced
+entry_restart = re.compile(r'(?mu)^[ \t]*@\w+[ \t]?{')
+entry_key = re.compile(r'(?u)[ \t]*([^,\s]*)[ \t]*,?\s*')
+entry_tokens = re.compile(r'[{}"]')
+# braced values nested once and strings, unrolled not to backtrack
+shallow_group = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}')
+entry_content = re.compile(r'[^{{}}"]*(?:(?:{}|"[^"]*")[^{{}}"]*)*'.format(shallow_group.pattern))
+field_name = re.compile(r'(?u)[,\s]*([^=,\s]+)\s*=\s*')
+braces = re.compile(r'[{}]')
+spaces = re.compile(r'(?u)\s*')
+
+# number of characters decoded and tokenized at once
+BLOCK_SIZE = 2 ** 16
+
+# number of characters of an entry above which it is dropped, such that an unterminated entry is not held in memory
+MAX_ENTRY_SIZE = 2 ** 20
+
+
+def decode(string):
+    """
+    Replaces the LaTeX sequences of special characters, e.g. accents, by the characters.
+
+    @type  string: string
+    @param string: text in BibTex format
+
+    @rtype: string
+    @return: the decoded text
+    """
+    string = special_chars_re.sub(lambda match: special_chars_map[match.group()], string)
+    return latex_accents.sub(r'\1', string)
+
+
+def _value_end(body, pos):
+    char = body[pos:pos + 1]
+    if char == '"':
+        end = body.find('"', pos + 1)
+        if end >= 0:
+            return end + 1
+    elif char == '{':
+        match = shallow_group.match(body, pos)
+        if match is not None:
+            return match.end()
+        depth = 0
+        for match in braces.finditer(body, pos):
+            depth += 1 if match.group() == '{' else -1
+            if not depth:
+                return match.end()
+    # unquoted value, or unterminated string
+    end = body.find(',', pos)
+    return len(body) if end < 0 else end
+
+
+def _field_value(key, value):
+    if value and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+    if value and value[0] == '{' and value[-1] == '}':
+        value = value[1:-1]
+    if key not in ['booktitle', 'title']:
+        value = value.replace('}', '').replace('{', '')
+    else:
+        if value.startswith('{') and value.endswith('}'):
+            value = value[1:]
+            value = value[:-1]
+    return ' '.join(value.split())
+
+
+def _parse_entry(entry_type, body):
+    match = entry_key.match(body)
+    entry = {'type': entry_type.lower(), 'key': match.group(1)}
+    fields = False
+    pos = match.end()
+    while True:
+        match = field_name.match(body, pos)
+        if match is not None:
+            start, end = match.span(1)
+            pos = match.end()
+        else:
+            # skip the text before the next equal sign, the name of the field is the word before it
+            equals = body.find('=', pos)
+            if equals < 0:
+                break
+            end = equals
+            while end > pos and body[end - 1].isspace():
+                end -= 1
+            start = end
+            while start > pos and body[start - 1] not in '=,' and not body[start - 1].isspace():
+                start -= 1
+            pos = spaces.match(body, equals + 1).end()
+            if start == end:
+                continue
+
+        value_end = _value_end(body, pos)
+        key = body[start:end].lower()
+        entry[key] = _field_value(key, body[pos:value_end])
+        fields = True
+        pos = value_end
+
+    return entry if fields else None
+
+
+def _blocks(file):
+    lines = []
+    length = 0
+    for line in file:
+        # make sure we are dealing with unicode strings
+        if not isinstance(line, six.text_type):
+            line = line.decode('utf-8')
+        lines.append(line)
+        length += len(line)
+        if length >= BLOCK_SIZE:
+            # no LaTeX sequence spans several lines
+            yield decode(''.join(lines))
+            del lines[:]
+            length = 0
+    if lines:
+        yield decode(''.join(lines))
+
+
+def _restart(block, pos):
+    match = entry_restart.search(block, pos)
+    return len(block) if match is None else match.start()
+
+
+def iterparse(file):
+    """
+    Reads BibTex entries one by one from a file, in linear time and holding a few lines in memory besides the current
+    entry. Entries without fields, e.g. comments, are skipped.
+
+    An entry whose braces are not balanced ends at the next line starting an entry, and is dropped once longer than
+    L{MAX_ENTRY_SIZE} characters.
+
+    @type  file: file or iterable
+    @param file: lines of a bibliography in BibTex format, as text or as UTF-8 encoded bytes
+
+    @rtype: generator
+    @return: dictionaries representing the entries, as returned by L{parse}
+    """
+    entry_type = None
+    depth = 0
+    quoted = False
+    body = []
+    size = 0
+
+    for block in _blocks(file):
+        start = pos = 0
+        restart = _restart(block, pos)
+        while True:
+            if entry_type is None:
+                match = entry_start.search(block, pos)
+                if match is None:
+                    break
+                entry_type = match.group(1)
+                depth = 1
+                quoted = False
+                start = pos = match.end()
+                del body[:]
+                size = 0
+                if restart < pos:
+                    restart = _restart(block, pos)
+
+            # braces are counted outside of strings delimited by double quotes, which may only be values
+            if quoted:
+                end = block.find('"', pos) + 1
+                if end and end <= restart:
+                    pos = end
+                    quoted = False
+                    continue
+            else:
+                if depth == 1:
+                    pos = entry_content.match(block, pos).end()
+                token = entry_tokens.search(block, pos)
+                if token is not None and token.end() <= restart:
+                    pos = token.end()
+                    char = block[pos - 1]
+                    if char == '"':
+                        quoted = depth == 1
+                    elif char == '{':
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if not depth:
+                            body.append(block[start:pos - 1])
+                            entry = _parse_entry(entry_type, ''.join(body))
+                            entry_type = None
+                            if entry is not None:
+                                yield entry
+                    continue
+
+            if restart < len(block):
+                # unbalanced braces, the entry ends before the next one
+                body.append(block[start:restart])
+                entry = _parse_entry(entry_type, ''.join(body))
+                entry_type = None
+                pos = restart
+                if entry is not None:
+                    yield entry
+                continue
+
+            body.append(block[start:])
+            size += len(block) - start
+            if size > MAX_ENTRY_SIZE:
+                entry_type = None
+                del body[:]
+            break
+
 
 def parse(string):
     """
@@ -55,47 +305,8 @@ def parse(string):
     @return: a list of dictionaries representing a bibliography
     """
 
-    # bibliography
-    bib = []
-
     # make sure we are dealing with unicode strings
     if not isinstance(string, six.text_type):
         string = string.decode('utf-8')
 
-    # replace special characters
-    for key, value in special_chars:
-        string = string.replace(key, value)
-    string = re.sub(r'\\[cuHvs]{?([a-zA-Z])}?', r'\1', string)
-
-    # split into BibTex entries
-    entries = re.findall(
-        r'(?u)@(\w+)[ \t]?{[ \t]*([^,\s]*)[ \t]*,?\s*((?:[^=,\s]+\s*\=\s*(?:"[^"]*"|{(?:[^{}]*|{[^{}]*})*}|[^,}]*),?\s*?)+)\s*}',
-        string)
-
-    for entry in entries:
-        # parse entry
-        pairs = re.findall(r'(?u)([^=,\s]+)\s*\=\s*("[^"]*"|{(?:[^{}]*|{[^{}]*})*}|[^,]*)', entry[2])
-
-        # add to bibliography
-        bib.append({'type': entry[0].lower(), 'key': entry[1]})
-
-        for key, value in pairs:
-            # post-process key and value
-            key = key.lower()
-            if value and value[0] == '"' and value[-1] == '"':
-                value = value[1:-1]
-            if value and value[0] == '{' and value[-1] == '}':
-                value = value[1:-1]
-            if key not in ['booktitle', 'title']:
-                value = value.replace('}', '').replace('{', '')
-            else:
-                if value.startswith('{') and value.endswith('}'):
-                    value = value[1:]
-                    value = value[:-1]
-            value = value.strip()
-            value = re.sub(r'\s+', ' ', value)
-
-            # store pair in bibliography
-            bib[-1][key] = value
-
-    return bib
+    return list(iterparse(io.StringIO(string)))
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in caches of the pages and exports of the publication views, and of the rendered publication cards, backed by
+Django's cache framework.
+
+The page cache is enabled by setting `PUBLICATIONS_BOOTSTRAP_PAGE_CACHE` to the alias of a cache in `CACHES`. All the
+cached pages are invalidated at once whenever publications, types, catalogs, links or files change, by incrementing a
+generation counter which is part of the cache keys, instead of scanning and deleting the keys. The counter is
+incremented once the changes are committed.
+
+The card cache is enabled by setting `PUBLICATIONS_BOOTSTRAP_CARD_CACHE`. A card is keyed by the modification time of
+its publication, which is updated along with its links and files, and by a version incremented when types or sites
+change.
+"""
+
+from __future__ import division
+
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+try:
+    from django.core.urlresolvers import get_script_prefix
+except ImportError:  # Django>=2.0
+    from django.urls import get_script_prefix
+
+from .apps import PublicationsBootstrapConfig
+from .compat import is_authenticated
+
+DEFAULT_PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# streamed exports larger than this are not cached, such that they are never held in memory
+DEFAULT_PAGE_CACHE_MAX_SIZE = 2 ** 20
+
+KEY_PREFIX = 'publications_bootstrap'
+GENERATION_KEY = KEY_PREFIX + ':generation'
+CARD_VERSION_KEY = KEY_PREFIX + ':card_version'
+
+# views decorated with `cache_page`
+VIEW_NAMES = ('by_year', 'by_author', 'by_tag', 'for_catalog', 'by_id')
+
+
+def get_cache(setting='page_cache'):
+    """
+    The cache of the pages, or of the cards with `setting='card_cache'`, or `None` if the cache is disabled.
+    """
+    alias = PublicationsBootstrapConfig.defaults.get(setting)
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def _generation(cache, key=GENERATION_KEY):
+    generation = cache.get(key)
+    if generation is None:
+        # start from a value unlikely to have been used before the counter was evicted
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _increment(cache, key):
+    if cache is None:
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the counter was evicted, the next generation starts from the current time
+        _generation(cache, key)
+
+
+def invalidate():
+    """
+    Invalidate all the cached pages, once the current transaction is committed. Otherwise, a concurrent request could
+    cache the uncommitted state under the new generation.
+    """
+    transaction.on_commit(lambda: _increment(get_cache(), GENERATION_KEY))
+
+
+def invalidate_cards():
+    """
+    Invalidate all the cached cards, the cards of a single publication are invalidated by saving it.
+    """
+    _increment(get_cache('card_cache'), CARD_VERSION_KEY)
+
+
+def card_key(cache, publication, template_name):
+    """
+    Key of the rendered card of a saved publication.
+    """
+    return '{}:card:{}:{}:{}:{}:{}'.format(KEY_PREFIX, _generation(cache, CARD_VERSION_KEY), get_script_prefix(),
+                                           template_name, publication.pk,
+                                           publication.modified.strftime('%Y%m%d%H%M%S%f'))
+
+
+def _stats_key(view_name, stat):
+    return '{}:stats:{}:{}'.format(KEY_PREFIX, view_name, stat)
+
+
+def _count(cache, view_name, stat):
+    key = _stats_key(view_name, stat)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def stats(view_names=VIEW_NAMES):
+    """
+    Hits and misses of the cached pages, per view.
+
+    Returns
+    -------
+    dict
+        For each view, a tuple of the number of hits, the number of misses and the hit ratio (`None` without requests).
+    """
+    cache = get_cache()
+    result = {}
+    for view_name in view_names:
+        if cache is None:
+            hits = misses = 0
+        else:
+            hits = cache.get(_stats_key(view_name, 'hits'), 0)
+            misses = cache.get(_stats_key(view_name, 'misses'), 0)
+        result[view_name] = (hits, misses, hits / (hits + misses) if hits + misses else None)
+    return result
+
+
+def clear_stats(view_names=VIEW_NAMES):
+    """
+    Reset the hits and misses of the cached pages, see `stats`.
+    """
+    cache = get_cache()
+    if cache is not None:
+        cache.delete_many([_stats_key(view_name, stat) for view_name in view_names for stat in ('hits', 'misses')])
+
+
+def _page_key(cache, view_name, request, args, kwargs):
+    # the query string selects the export format or the page
+    signature = repr((args, sorted(kwargs.items()), sorted(request.GET.lists()), request.get_host()))
+    return '{}:page:{}:{}:{}'.format(KEY_PREFIX, _generation(cache), view_name,
+                                     md5(signature.encode('utf-8')).hexdigest())
+
+
+def _cache_streaming(cache, key, timeout, response, streaming_content):
+    max_size = PublicationsBootstrapConfig.defaults.get('page_cache_max_size', DEFAULT_PAGE_CACHE_MAX_SIZE)
+    chunks = []
+    size = 0
+    for chunk in streaming_content:
+        if chunks is not None:
+            size += len(chunk)
+            if size > max_size:
+                # too large, the rest of the export is only streamed
+                chunks = None
+            else:
+                chunks.append(chunk)
+        yield chunk
+    if chunks is None:
+        return
+    cached = HttpResponse(b''.join(chunks), status=response.status_code)
+    for header, value in response.items():
+        cached[header] = value
+    cache.set(key, cached, timeout)
+
+
+def cache_page(view):
+    """
+    Decorator caching the successful responses of a view to anonymous GET requests, see `get_cache`.
+    """
+    view_name = view.__name__
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cache = get_cache()
+        user = getattr(request, 'user', None)
+        messages = getattr(request, '_messages', None)
+        if cache is None or request.method not in ('GET', 'HEAD') or (user is not None and is_authenticated(user)) \
+                or (messages is not None and len(messages)):
+            # pages with pending messages are rendered for a single request
+            return view(request, *args, **kwargs)
+
+        key = _page_key(cache, view_name, request, args, kwargs)
+        response = cache.get(key)
+        if response is not None:
+            _count(cache, view_name, 'hits')
+            return response
+        _count(cache, view_name, 'misses')
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = PublicationsBootstrapConfig.defaults.get('page_cache_timeout', DEFAULT_PAGE_CACHE_TIMEOUT)
+            if response.streaming:
+                # stored once fully sent unless too large, the export is still streamed to the client
+                response.streaming_content = _cache_streaming(cache, key, timeout, response,
+                                                                response.streaming_content)
+            else:
+                cache.set(key, response, timeout)
+        return response
+
+    return wrapper
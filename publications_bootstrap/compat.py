@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Compatibility with the supported versions of Django.
+"""
+
+
+def is_authenticated(user):
+    """
+    Whether the user is authenticated, `User.is_authenticated` being a method before Django 1.10.
+    """
+    if callable(user.is_authenticated):
+        return user.is_authenticated()
+    return user.is_authenticated
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ... import cache
+from ...models import Publication
+
+
+class Command(BaseCommand):
+    help = 'Persist the generated BibTex keys of the publications without citekey.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run', default=False,
+                            help='Only show the citekeys which would be assigned.')
+
+    def handle(self, *args, **options):
+        missing = Publication.objects.filter(citekey__isnull=True)
+        taken = set(Publication.objects.filter(citekey__isnull=False).values_list('citekey_lower', flat=True))
+
+        assigned = 0
+        years = missing.order_by('year').values_list('year', flat=True).distinct()
+        for year in years:
+            # one grouped pass per year, as keys only depend on the publications of the same year
+            publications = list(missing.filter(year=year).only('pk', 'year', 'authors', 'citekey').order_by('pk'))
+            keys = Publication._generate_keys(publications)
+            with transaction.atomic():
+                for publication, key in zip(publications, keys):
+                    # the citekeys of other publications may collide with the generated key, use the next free one
+                    while key.lower() in taken:
+                        key = key[:-1] + chr(ord(key[-1]) + 1)
+                    taken.add(key.lower())
+                    if options['verbosity'] > 1 or options['dry_run']:
+                        self.stdout.write('{}: {}'.format(publication.pk, key))
+                    if not options['dry_run']:
+                        Publication.objects.filter(pk=publication.pk).update(
+                            citekey=key, citekey_lower=key.lower(), modified=timezone.now())
+                    assigned += 1
+
+        if assigned and not options['dry_run']:
+            # the updates bypass the signals
+            cache.invalidate()
+
+        self.stdout.write(self.style.SUCCESS('{} citekey(s) {}assigned.'.format(
+            assigned, 'would be ' if options['dry_run'] else '')))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import deque
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...apps import PublicationsBootstrapConfig
+from ...utils.import_bibtex import BATCH_SIZE, _chunks, _import_entries, _parse_chunk, _prepare_chunk, open_bibtex
+
+# files imported from the directories
+EXTENSIONS = ('.bib', '.bib.gz', '.bibtex', '.bibtex.gz')
+
+# ** matches subdirectories from Python 3.5
+GLOB_OPTIONS = {'recursive': True} if sys.version_info >= (3, 5) else {}
+
+
+class Command(BaseCommand):
+    help = 'Import BibTex files, resuming an interrupted import.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path',
+                            help='BibTex file, optionally compressed with gzip, directory or glob pattern.')
+        parser.add_argument('--jobs', type=int, dest='jobs', default=multiprocessing.cpu_count(),
+                            help='Number of processes parsing the entries (default: number of CPUs).')
+        parser.add_argument('--batch-size', type=int, dest='batch_size', default=None,
+                            help='Number of entries saved at once (default: PUBLICATIONS_BOOTSTRAP_IMPORT_BATCH_SIZE).')
+        parser.add_argument('--checkpoint', dest='checkpoint', default='.import_bibtex_checkpoint.json',
+                            help='File recording the entries already imported, removed once the import completes '
+                                 '(default: .import_bibtex_checkpoint.json).')
+        parser.add_argument('--restart', action='store_true', dest='restart', default=False,
+                            help='Ignore the checkpoint of an interrupted import.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or \
+            PublicationsBootstrapConfig.defaults.get('import_batch_size', BATCH_SIZE)
+        files = self._files(options['paths'])
+
+        self.checkpoint_path = options['checkpoint']
+        self.checkpoint = {}
+        if os.path.exists(self.checkpoint_path) and not options['restart']:
+            with open(self.checkpoint_path) as f:
+                self.checkpoint = json.load(f)
+
+        totals = dict(files=0, size=0, parsed=0, saved=0, updated=0, skipped=0, errors=0)
+        pool = None
+        if options['jobs'] > 1:
+            # an interruption is handled by the command, which terminates the workers
+            pool = multiprocessing.Pool(options['jobs'], signal.signal, (signal.SIGINT, signal.SIG_IGN))
+        start = time.time()
+        try:
+            for path in files:
+                stat = os.stat(path)
+                state = self.checkpoint.get(path)
+                if state is None or (state['size'], state['mtime']) != (stat.st_size, stat.st_mtime):
+                    # new or modified since interrupted
+                    state = self.checkpoint[path] = dict(size=stat.st_size, mtime=stat.st_mtime, records=0)
+                if options['verbosity'] > 0:
+                    self.stdout.write('Importing {}{}...'.format(
+                        path, ' after {} entries'.format(state['records']) if state['records'] else ''))
+                self._import(path, state, batch_size, pool, totals, options)
+                totals['files'] += 1
+        except KeyboardInterrupt:
+            self.stderr.write('Interrupted, run the same command to resume.')
+        else:
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        elapsed = max(time.time() - start, 1e-6)
+        self.stdout.write('{files} file(s), {parsed} entries: {saved} added, {updated} updated, {skipped} unchanged, '
+                          '{errors} error(s).'
+                          .format(**totals))
+        style = self.style.SUCCESS if not totals['errors'] else self.style.WARNING
+        self.stdout.write(style('{:.1f}s, {:.0f} entries/s, {:.2f} MB/s.'.format(
+            elapsed, totals['parsed'] / elapsed, totals['size'] / elapsed / 2 ** 20)))
+
+    def _files(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, names in os.walk(path):
+                    dirs.sort()
+                    files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(EXTENSIONS))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                matches = sorted(match for match in glob.glob(path, **GLOB_OPTIONS) if os.path.isfile(match))
+                if not matches:
+                    raise CommandError('No BibTex file found at "{}".'.format(path))
+                files.extend(matches)
+
+        # the checkpoint is kept per absolute path, each file is imported once
+        unique = []
+        for path in map(os.path.abspath, files):
+            if path not in unique:
+                unique.append(path)
+        return unique
+
+    def _save_checkpoint(self):
+        # replaced at once, such that the checkpoint is never partially written
+        with open(self.checkpoint_path + '.tmp', 'w') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def _import(self, path, state, batch_size, pool, totals, options):
+        with open(path, 'rb') as f:
+            # the records the publications were imported from are left out before parsing
+            chunks = ((len(records), sum(map(len, records))) + _prepare_chunk(strings, records, skip_unchanged=True)
+                      for strings, records in _chunks(open_bibtex(f), batch_size, skip=state['records']))
+            for records, size, entries, hashes, skipped in self._parse(chunks, pool, options['jobs']):
+                # a chunk is saved in one transaction, it is recorded once committed
+                with transaction.atomic():
+                    batches = list(_import_entries([(entries, hashes, skipped)], batch_size))
+                state['records'] += records
+                totals['size'] += size
+                totals['parsed'] += len(entries) + skipped
+                for batch in batches:
+                    totals['saved'] += batch.created
+                    totals['updated'] += batch.updated
+                    totals['skipped'] += len(batch.publications) - batch.created - batch.updated + batch.skipped
+                    totals['errors'] += len(batch.errors)
+                    if options['verbosity'] > 1:
+                        for error in batch.errors:
+                            self.stderr.write(error)
+                self._save_checkpoint()
+
+    def _parse(self, chunks, pool, jobs):
+        if pool is None:
+            for records, size, data, hashes, skipped in chunks:
+                yield records, size, _parse_chunk(data), hashes, skipped
+            return
+
+        # a few chunks are parsed ahead by the pool, the memory used does not depend on the size of the file
+        pending = deque()
+        for records, size, data, hashes, skipped in chunks:
+            pending.append((records, size, pool.apply_async(_parse_chunk, (data,)), hashes, skipped))
+            if len(pending) > 2 * jobs:
+                records, size, result, hashes, skipped = pending.popleft()
+                yield records, size, result.get(), hashes, skipped
+        while pending:
+            records, size, result, hashes, skipped = pending.popleft()
+            yield records, size, result.get(), hashes, skipped
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import cache
+
+
+class Command(BaseCommand):
+    help = 'Show the hits and misses of the cached pages of the publication views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', dest='clear', default=False,
+                            help='Reset the statistics after showing them.')
+
+    def handle(self, *args, **options):
+        if cache.get_cache() is None:
+            raise CommandError('The page cache is disabled, see PUBLICATIONS_BOOTSTRAP_PAGE_CACHE.')
+
+        for view_name, (hits, misses, ratio) in sorted(cache.stats().items()):
+            self.stdout.write('{}: {} hit(s), {} miss(es), hit ratio {}'.format(
+                view_name, hits, misses, '-' if ratio is None else '{:.1%}'.format(ratio)))
+
+        if options['clear']:
+            cache.clear_stats()
+            self.stdout.write(self.style.SUCCESS('Statistics cleared.'))
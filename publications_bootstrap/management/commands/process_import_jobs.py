@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...models import ImportJob
+from ...utils import process_import_job
+
+
+class Command(BaseCommand):
+    help = 'Process the BibTex imports queued from the admin, polling for new ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', dest='once', default=False,
+                            help='Exit once no import is queued, e.g. when run periodically.')
+        parser.add_argument('--interval', type=float, dest='interval', default=5.,
+                            help='Seconds between the polls of the queue (default: 5).')
+        parser.add_argument('--batch-size', type=int, dest='batch_size', default=None,
+                            help='Number of entries saved at once (default: PUBLICATIONS_BOOTSTRAP_IMPORT_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        while True:
+            job = ImportJob.objects.claim()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            if options['verbosity'] > 0:
+                self.stdout.write('Importing {}...'.format(job))
+            process_import_job(job, batch_size=options['batch_size'])
+            if options['verbosity'] > 0:
+                style = self.style.SUCCESS if job.status == ImportJob.EStatuses.DONE else self.style.ERROR
+                self.stdout.write(style('{}: {} entries, {} added, {} updated, {} unchanged, {} error(s).'.format(
+                    job.status.label, job.parsed, job.saved, job.updated, job.skipped, job.error_count)))
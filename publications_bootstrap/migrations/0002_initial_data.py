@@ -10,7 +10,15 @@ fixture = 'initial_data'
 
 
 def load_fixtures(apps, schema_editor):
-    management.call_command('loaddata', fixture, app_label=app_label)
+    # deserialize with the historical models, the current ones may have fields added by later migrations
+    from django.core.serializers import python
+
+    _get_model = python._get_model
+    python._get_model = lambda model_identifier: apps.get_model(model_identifier)
+    try:
+        management.call_command('loaddata', fixture, app_label=app_label)
+    finally:
+        python._get_model = _get_model
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:06
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # parsing of author names is not available on historical models
+    from publications_bootstrap.models import Publication as CurrentPublication
+
+    Publication = apps.get_model(app_label, 'Publication')
+    Author = apps.get_model(app_label, 'Author')
+    PublicationAuthor = apps.get_model(app_label, 'PublicationAuthor')
+
+    authors = {}
+    publication_authors = []
+    for pk, authors_str in Publication.objects.values_list('pk', 'authors').iterator():
+        parsed = CurrentPublication(authors=authors_str)
+        for position, author in enumerate(parsed.authors_list):
+            for name_simple in CurrentPublication.simplify_author(author):
+                if name_simple not in authors:
+                    authors[name_simple] = Author.objects.create(name=author, name_simple=name_simple).pk
+                publication_authors.append(
+                    PublicationAuthor(publication_id=pk, author_id=authors[name_simple], position=position))
+    PublicationAuthor.objects.bulk_create(publication_authors, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0006_auto_20180321_0115'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=512)),
+                ('name_simple', models.CharField(db_index=True, max_length=512, unique=True)),
+            ],
+            options={
+                'verbose_name': 'автор',
+                'verbose_name_plural': 'авторы',
+                'ordering': ('name_simple',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PublicationAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='publications_bootstrap.Author')),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='publications_bootstrap.Publication')),
+            ],
+            options={
+                'verbose_name': 'автор публикации',
+                'verbose_name_plural': 'авторы публикаций',
+                'ordering': ('publication', 'position'),
+            },
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='publications',
+            field=models.ManyToManyField(blank=True, through='publications_bootstrap.PublicationAuthor', to='publications_bootstrap.Publication'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='publicationauthor',
+            unique_together=set([('publication', 'author', 'position')]),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
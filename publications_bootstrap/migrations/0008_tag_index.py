@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:09
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+app_label = 'publications_bootstrap'
+
+BATCH_SIZE = 500
+
+
+def forwards(apps, schema_editor):
+    Publication = apps.get_model(app_label, 'Publication')
+    Tag = apps.get_model(app_label, 'Tag')
+    PublicationTag = Tag.publications.through
+
+    tags = {}
+    last_pk = 0
+    while True:
+        # walk the publications in chunks to keep memory bounded on large tables
+        chunk = list(Publication.objects.filter(pk__gt=last_pk).exclude(tags='')
+                     .order_by('pk').values_list('pk', 'tags')[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+
+        publication_tags = []
+        for pk, tags_str in chunk:
+            names = set(tag.strip().lower() for tag in tags_str.split(','))
+            names.discard('')
+            for name in sorted(names):
+                if name not in tags:
+                    tags[name] = Tag.objects.create(name=name).pk
+                publication_tags.append(PublicationTag(publication_id=pk, tag_id=tags[name]))
+        PublicationTag.objects.bulk_create(publication_tags, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0007_author_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=256, unique=True)),
+                ('publications', models.ManyToManyField(blank=True, to='publications_bootstrap.Publication')),
+            ],
+            options={
+                'verbose_name': 'тег',
+                'verbose_name_plural': 'теги',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
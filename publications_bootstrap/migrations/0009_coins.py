@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+app_label = 'publications_bootstrap'
+
+BATCH_SIZE = 500
+
+FIELDS = ('book_title', 'journal', 'doi', 'title', 'publisher', 'volume', 'pages', 'number', 'year', 'month', 'authors',
+          'isbn')
+
+
+def forwards(apps, schema_editor):
+    # computation of the COinS is not available on historical models
+    from publications_bootstrap.models import Publication as CurrentPublication
+
+    Publication = apps.get_model(app_label, 'Publication')
+
+    last_pk = 0
+    while True:
+        chunk = list(Publication.objects.filter(pk__gt=last_pk).order_by('pk').values('pk', *FIELDS)[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1]['pk']
+
+        for values in chunk:
+            pk = values.pop('pk')
+            coins = CurrentPublication(**values)._produce_coins()
+            Publication.objects.filter(pk=pk).update(coins=coins)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0008_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='coins',
+            field=models.TextField(blank=True, editable=False, help_text='COinS (Z39.88) of the publication, without the version and the referrer.'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
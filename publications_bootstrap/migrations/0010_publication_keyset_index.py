@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:13
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0009_coins'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='publication',
+            index_together=set([('year', 'month', 'id')]),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 09:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import publications_bootstrap.fields
+
+app_label = 'publications_bootstrap'
+
+BATCH_SIZE = 500
+
+
+def _free(key, taken):
+    # the next key which differs from the taken ones regardless of the case, as the suffixes of assign_citekeys
+    candidate = key[:511] + 'b'
+    while candidate.lower() in taken:
+        candidate = candidate[:-1] + chr(ord(candidate[-1]) + 1)
+    return candidate
+
+
+def forwards(apps, schema_editor):
+    Publication = apps.get_model(app_label, 'Publication')
+    Catalog = apps.get_model(app_label, 'Catalog')
+
+    # the citekeys which only differ by their case are disambiguated before they are made unique, the publication
+    # added first keeping its citekey
+    taken = set(citekey.lower() for citekey in Publication.objects.filter(citekey__isnull=False)
+                .values_list('citekey', flat=True).iterator())
+    seen = set()
+    last_pk = 0
+    while True:
+        chunk = list(Publication.objects.filter(pk__gt=last_pk, citekey__isnull=False).order_by('pk')
+                     .values_list('pk', 'citekey')[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+
+        for pk, citekey in chunk:
+            if citekey.lower() in seen:
+                citekey = _free(citekey, taken)
+                taken.add(citekey.lower())
+            seen.add(citekey.lower())
+            Publication.objects.filter(pk=pk).update(citekey=citekey, citekey_lower=citekey.lower() or None)
+
+    # so are the titles of the catalogs
+    catalogs = list(Catalog.objects.order_by('pk').values_list('pk', 'title'))
+    taken = set(title.lower() for pk, title in catalogs)
+    seen = set()
+    for pk, title in catalogs:
+        if title.lower() in seen:
+            number = 2
+            while '{} ({})'.format(title[:120], number).lower() in taken:
+                number += 1
+            title = '{} ({})'.format(title[:120], number)
+            taken.add(title.lower())
+        seen.add(title.lower())
+        Catalog.objects.filter(pk=pk).update(title=title, title_lower=title.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0011_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='citekey_lower',
+            field=publications_bootstrap.fields.NullCharField(editable=False, max_length=512, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalog',
+            name='title_lower',
+            field=models.CharField(editable=False, max_length=128, null=True),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='publication',
+            name='citekey_lower',
+            field=publications_bootstrap.fields.NullCharField(editable=False, max_length=512, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='catalog',
+            name='title_lower',
+            field=models.CharField(editable=False, max_length=128, unique=True),
+        ),
+    ]
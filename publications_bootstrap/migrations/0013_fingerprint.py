@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+app_label = 'publications_bootstrap'
+
+BATCH_SIZE = 500
+
+FIELDS = ('title', 'authors', 'year', 'doi', 'isbn')
+
+
+def forwards(apps, schema_editor):
+    # computation of the fingerprint is not available on historical models
+    from publications_bootstrap.models import Publication as CurrentPublication
+
+    Publication = apps.get_model(app_label, 'Publication')
+
+    last_pk = 0
+    while True:
+        chunk = list(Publication.objects.filter(pk__gt=last_pk).order_by('pk').values('pk', *FIELDS)[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1]['pk']
+
+        for values in chunk:
+            pk = values.pop('pk')
+            fingerprint = CurrentPublication(**values)._produce_fingerprint()
+            Publication.objects.filter(pk=pk).update(fingerprint=fingerprint)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0012_lowercase_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Hash of the normalized title, family names of the authors, year and DOI or ISBN, shared by possible duplicates.', max_length=40),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
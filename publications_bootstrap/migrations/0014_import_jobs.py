@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:50
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import echoices.fields
+import publications_bootstrap.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('publications_bootstrap', '0013_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(help_text='BibTex file, optionally compressed with gzip.', upload_to='publications_bootstrap/imports/')),
+                ('status', echoices.fields.make_echoicefield(default=publications_bootstrap.models.ImportJob.EStatuses.QUEUED, echoices=publications_bootstrap.models.ImportJob.EStatuses, editable=False)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('started', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('finished', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('parsed', models.PositiveIntegerField(default=0, editable=False, help_text='Number of entries read.')),
+                ('saved', models.PositiveIntegerField(default=0, editable=False, help_text='Number of publications added.')),
+                ('skipped', models.PositiveIntegerField(default=0, editable=False, help_text='Number of entries matching existing publications.')),
+                ('error_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('errors', models.TextField(blank=True, editable=False, help_text='Error messages, one per line.')),
+                ('user', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'импорт BibTex',
+                'verbose_name_plural': 'импорты BibTex',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
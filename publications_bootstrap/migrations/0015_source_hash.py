@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:56
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0014_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='updated',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of publications updated from changed entries.'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='source_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of the BibTex entry the publication was imported from, unchanged entries are skipped when imported again.', max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='skipped',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of entries matching unchanged publications.'),
+        ),
+    ]
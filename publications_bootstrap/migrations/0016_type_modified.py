@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def legacy_alter_table(value):
+    # SQLite 3.26+ otherwise points the foreign keys to the type at the table renamed while the type table is rebuilt
+    def set_pragma(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor.execute('PRAGMA legacy_alter_table = {}'.format(value))
+    return set_pragma
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0015_source_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(legacy_alter_table('ON'), legacy_alter_table('OFF')),
+        migrations.AddField(
+            model_name='type',
+            name='modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(legacy_alter_table('OFF'), legacy_alter_table('ON')),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+app_label = 'publications_bootstrap'
+
+BATCH_SIZE = 500
+
+# identifier of the COinS stored for the publications without DOI
+MISSING_DOI = '&rft_id=info:doi/None'
+
+
+def forwards(apps, schema_editor):
+    Publication = apps.get_model(app_label, 'Publication')
+
+    last_pk = 0
+    while True:
+        chunk = list(Publication.objects.filter(pk__gt=last_pk, coins__contains=MISSING_DOI + '&').order_by('pk')
+                     .values_list('pk', 'coins')[:BATCH_SIZE])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+
+        for pk, coins in chunk:
+            Publication.objects.filter(pk=pk).update(coins=coins.replace(MISSING_DOI + '&', '&', 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0016_type_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
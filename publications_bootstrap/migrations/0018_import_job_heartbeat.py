@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # the running jobs are considered alive since they started
+    ImportJob = apps.get_model(app_label, 'ImportJob')
+    ImportJob.objects.filter(status='r').update(heartbeat=models.F('started'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publications_bootstrap', '0017_coins_doi'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Last time the worker saved the progress of the job.', null=True),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -5,3 +5,6 @@ from .catalog import Catalog
 from .publication import Publication
 from .publicationlink import PublicationLink
 from .publicationfile import PublicationFile
+from .author import Author, PublicationAuthor
+from .tag import Tag
+from .importjob import ImportJob
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from django.db import models
+
+from .publication import Publication
+
+# keep the number of query parameters below the limits of SQLite
+BATCH_SIZE = 500
+
+
+def _batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Author(models.Model):
+    """
+    Model representing an author, identified by the simplified representation of its name.
+    """
+
+    class Meta:
+        ordering = ('name_simple',)
+        app_label = 'publications_bootstrap'  # Fix for Django<1.7
+        verbose_name = 'автор'
+        verbose_name_plural = 'авторы'
+
+    name = models.CharField(max_length=512)
+    name_simple = models.CharField(max_length=512, unique=True, db_index=True)
+    publications = models.ManyToManyField(Publication, through='PublicationAuthor', blank=True)
+
+    def __unicode__(self):
+        return self.name
+
+    def __str__(self):
+        return self.name
+
+
+class PublicationAuthorManager(models.Manager):
+    def index(self, publications):
+        """
+        Rebuild the author index of the given (saved) publications.
+        """
+        publications = [publication for publication in publications if publication.pk is not None]
+
+        # simplified names of the authors of each publication, with their position in the list of authors
+        entries = []
+        for publication in publications:
+            for position, author in enumerate(publication.authors_list):
+                for name_simple in Publication.simplify_author(author):
+                    entries.append((publication.pk, position, author, name_simple))
+
+        names = {}
+        for _, _, author, name_simple in entries:
+            names.setdefault(name_simple, author)
+
+        # create missing authors
+        authors = {}
+        for batch in _batches(names):
+            authors.update(Author.objects.filter(name_simple__in=batch).values_list('name_simple', 'pk'))
+        missing = [name_simple for name_simple in names if name_simple not in authors]
+        if missing:
+            Author.objects.bulk_create([Author(name=names[name_simple], name_simple=name_simple)
+                                        for name_simple in missing], batch_size=BATCH_SIZE)
+            for batch in _batches(missing):
+                authors.update(Author.objects.filter(name_simple__in=batch).values_list('name_simple', 'pk'))
+
+        for batch in _batches([publication.pk for publication in publications]):
+            self.filter(publication_id__in=batch).delete()
+        self.bulk_create([PublicationAuthor(publication_id=publication_id, author_id=authors[name_simple],
+                                            position=position)
+                          for publication_id, position, _, name_simple in entries], batch_size=BATCH_SIZE)
+
+
+class PublicationAuthor(models.Model):
+    """
+    Position of an author in the list of authors of a publication.
+    """
+
+    class Meta:
+        ordering = ('publication', 'position')
+        app_label = 'publications_bootstrap'  # Fix for Django<1.7
+        unique_together = ('publication', 'author', 'position')
+        verbose_name = 'автор публикации'
+        verbose_name_plural = 'авторы публикаций'
+
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE)
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    position = models.PositiveIntegerField()
+
+    objects = PublicationAuthorManager()
+
+    def __unicode__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return '{} ({})'.format(self.author, self.position + 1)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from django.db import models
+from django.utils import timezone
 from .publication import Publication
 
 
@@ -16,8 +17,12 @@ class Catalog(models.Model):
         verbose_name_plural = 'каталоги'
 
     title = models.CharField(max_length=128, unique=True, db_index=True)
+    # lowercase title for case-insensitive lookups using the unique index, maintained on save
+    title_lower = models.CharField(max_length=128, unique=True, editable=False)
     description = models.CharField(max_length=128)
     publications = models.ManyToManyField(Publication, blank=True, db_index=True)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    modified = models.DateTimeField(default=timezone.now, editable=False)
 
     def __unicode__(self):
         return self.title
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from echoices.enums import EChoice
+from echoices.fields import make_echoicefield
+
+from ..apps import PublicationsBootstrapConfig
+
+# seconds without progress after which a running job is considered abandoned by its worker
+DEFAULT_IMPORT_JOB_TIMEOUT = 10 * 60
+
+# counters of a job, reset when an abandoned job is claimed again
+PROGRESS = {'parsed': 0, 'saved': 0, 'updated': 0, 'skipped': 0, 'error_count': 0, 'errors': ''}
+
+
+class ImportJobManager(models.Manager):
+    def claim(self, timeout=None):
+        """
+        Mark the oldest queued job as running and return it, or `None` if no job is queued. A job is claimed by a
+        single worker, even if several workers are running.
+
+        Once no job is queued, a running job whose worker did not save any progress for `timeout` seconds, e.g. as the
+        worker was killed, is claimed again and imported from the start. The entries already imported are left out as
+        unchanged.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Defaults to `PUBLICATIONS_BOOTSTRAP_IMPORT_JOB_TIMEOUT`.
+        """
+        if timeout is None:
+            timeout = PublicationsBootstrapConfig.defaults.get('import_job_timeout', DEFAULT_IMPORT_JOB_TIMEOUT)
+        while True:
+            job = self.filter(status=ImportJob.EStatuses.QUEUED).order_by('created', 'pk').first()
+            if job is None:
+                job = self.filter(status=ImportJob.EStatuses.RUNNING,
+                                  heartbeat__lt=timezone.now() - timedelta(seconds=timeout)) \
+                    .order_by('heartbeat', 'pk').first()
+            if job is None:
+                return None
+            now = timezone.now()
+            if self.filter(pk=job.pk, status=job.status, heartbeat=job.heartbeat) \
+                    .update(status=ImportJob.EStatuses.RUNNING, started=now, heartbeat=now, **PROGRESS):
+                job.status = ImportJob.EStatuses.RUNNING
+                job.started = job.heartbeat = now
+                for field, value in PROGRESS.items():
+                    setattr(job, field, value)
+                return job
+
+
+class ImportJob(models.Model):
+    """
+    BibTex import queued from the admin and processed by the `process_import_jobs` command, with its progress and
+    results.
+    """
+
+    class Meta:
+        ordering = ('-created',)
+        app_label = 'publications_bootstrap'  # Fix for Django<1.7
+        verbose_name = 'импорт BibTex'
+        verbose_name_plural = 'импорты BibTex'
+
+    class EStatuses(EChoice):
+        QUEUED = ('q', _('queued'))
+        RUNNING = ('r', _('running'))
+        DONE = ('d', _('done'))
+        FAILED = ('f', _('failed'))
+
+        def __str__(self):
+            """
+            use value as string representation,
+            otherwise loaddata does not work with data dumped with dumpdata
+            """
+            return str(self.value)
+
+    file = models.FileField(upload_to='publications_bootstrap/imports/',
+                            help_text='BibTex file, optionally compressed with gzip.')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, editable=False,
+                             on_delete=models.SET_NULL)
+    status = make_echoicefield(EStatuses, default=EStatuses.QUEUED, editable=False)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    started = models.DateTimeField(null=True, blank=True, editable=False)
+    heartbeat = models.DateTimeField(null=True, blank=True, editable=False,
+                                     help_text='Last time the worker saved the progress of the job.')
+    finished = models.DateTimeField(null=True, blank=True, editable=False)
+    parsed = models.PositiveIntegerField(default=0, editable=False, help_text='Number of entries read.')
+    saved = models.PositiveIntegerField(default=0, editable=False, help_text='Number of publications added.')
+    updated = models.PositiveIntegerField(default=0, editable=False,
+                                          help_text='Number of publications updated from changed entries.')
+    skipped = models.PositiveIntegerField(default=0, editable=False,
+                                          help_text='Number of entries matching unchanged publications.')
+    error_count = models.PositiveIntegerField(default=0, editable=False)
+    errors = models.TextField(blank=True, editable=False, help_text='Error messages, one per line.')
+
+    objects = ImportJobManager()
+
+    def __unicode__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return '{} ({})'.format(self.file.name, self.created.strftime('%Y-%m-%d %H:%M'))
+
+    @property
+    def error_list(self):
+        return self.errors.splitlines()
+
+    @property
+    def progress(self):
+        """
+        Status and counters of the job, as polled by the admin.
+        """
+        return {'status': str(self.status), 'status_label': str(self.status.label), 'parsed': self.parsed,
+                'saved': self.saved, 'updated': self.updated, 'skipped': self.skipped, 'errors': self.error_count,
+                'finished': self.status in (ImportJob.EStatuses.DONE, ImportJob.EStatuses.FAILED)}
@@ -1,20 +1,171 @@
 # -*- coding: utf-8 -*-
+import re
 import warnings
+from collections import namedtuple
+from functools import lru_cache
+from hashlib import sha1
 from string import ascii_uppercase
 from ckeditor.fields import RichTextField
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.utils.http import urlquote_plus
 from django.utils.translation import ugettext_lazy as _
 from django_countries.fields import CountryField
 from echoices.enums import EChoice, EOrderedChoice, EChoiceMeta
 from echoices.fields import make_echoicefield
+from ..apps import PublicationsBootstrapConfig
+from ..bibtex import latex_escape
 from ..fields import NullCharField, PagesField
 from ..models import Type
 
 if 'django.contrib.sites' in settings.INSTALLED_APPS:
     from django.contrib.sites.models import Site
 
+DEFAULT_AUTHORS_CACHE_SIZE = 4096
+
+ParsedAuthors = namedtuple('ParsedAuthors',
+                           ['authors', 'authors_list', 'authors_list_simple', 'authors_list_split', 'authors_bibtex'])
+
+
+@lru_cache(maxsize=None)
+def rfr_id():
+    """
+    Referrer of the COinS (Z39.88), derived from the domain of the current site.
+
+    The result is cached for the whole process, the cache is cleared when a site is saved or deleted.
+
+    Returns
+    -------
+    str
+        For example, 'rfr_id=info:sid/www.example.com:example'.
+    """
+    if 'django.contrib.sites' in settings.INSTALLED_APPS:
+        domain = Site.objects.get_current().domain
+    else:
+        domain = 'example.com'
+
+    name = domain.split('.')
+
+    if len(name) > 2:
+        name = name[-2]
+    elif len(name) > 1:
+        name = name[0]
+    else:
+        name = ''
+
+    return 'rfr_id=info:sid/' + domain + ':' + name
+
+
+@lru_cache(maxsize=PublicationsBootstrapConfig.defaults.get('authors_cache_size', DEFAULT_AUTHORS_CACHE_SIZE))
+def parse_authors(authors):
+    """
+    Parse authors string to create lists of authors.
+
+    The same authors strings appear in many publications, hence the results are cached process-wide. Use
+    `parse_authors.cache_info()` to monitor the hits and misses of the cache, whose size is set with
+    `PUBLICATIONS_BOOTSTRAP_AUTHORS_CACHE_SIZE`.
+
+    Parameters
+    ----------
+    authors : str
+        List of authors separated by commas or *and*.
+
+    Returns
+    -------
+    ParsedAuthors
+        Immutable result, with the normalized authors string, the tuples of (abbreviated) author names, of their
+        simplified representations and of their (given name, family name) pairs, and the authors in BibTex format.
+    """
+
+    # post-process author names
+    authors = authors.replace(', and ', ', ')
+    authors = authors.replace(',and ', ', ')
+    authors = authors.replace(' and ', ', ')
+    authors = authors.replace(';', ',')
+
+    # list of authors
+    authors_list = [author.strip() for author in authors.split(',')]
+
+    # simplified representation of author names
+    authors_list_simple = []
+
+    # author names represented as a tuple of given and family name
+    authors_list_split = []
+
+    suffixes = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', "Jr.", "Sr."]
+    prefixes = ['Dr.']
+    prepositions = ['van', 'von', 'der', 'de', 'den']
+
+    # further post-process author names
+    for i, author in enumerate(authors_list):
+        if author == '':
+            continue
+
+        names = author.split(' ')
+
+        # check if last string contains initials
+        if (len(names[-1]) <= 3) \
+                and names[-1] not in suffixes \
+                and all(c in ascii_uppercase for c in names[-1]):
+            # turn "Gauss CF" into "C. F. Gauss"
+            names = [c + '.' for c in names[-1]] + names[:-1]
+
+        # number of suffixes
+        num_suffixes = 0
+        for name in names[::-1]:
+            if name in suffixes:
+                num_suffixes += 1
+            else:
+                break
+
+        # abbreviate names
+        for j, name in enumerate(names[:-1 - num_suffixes]):
+            # don't try to abbreviate these
+            if j == 0 and name in prefixes:
+                continue
+            if j > 0 and name in prepositions:
+                continue
+
+            if (len(name) > 2) or (len(name) and (name[-1] != '.')):
+                k = name.find('-')
+                if 0 < k + 1 < len(name):
+                    # take care of dash
+                    names[j] = name[0] + '.-' + name[k + 1] + '.'
+                else:
+                    names[j] = name[0] + '.'
+
+        if len(names):
+            authors_list[i] = ' '.join(names)
+
+            # create simplified/normalized representation of author name
+            authors_list_simple.extend(Publication.simplify_author(authors_list[i]))
+
+            # number of prepositions
+            num_prepositions = 0
+            for name in names:
+                if name in prepositions:
+                    num_prepositions += 1
+
+            # splitting point
+            sp = 1 + num_suffixes + num_prepositions
+            authors_list_split.append((' '.join(names[:-sp]), ' '.join(names[-sp:])))
+
+    # normalized authors string
+    if len(authors_list) > 2:
+        authors = ', and '.join([', '.join(authors_list[:-1]), authors_list[-1]])
+    elif len(authors_list) > 1:
+        authors = ' and '.join(authors_list)
+    else:
+        authors = authors_list[0]
+
+    return ParsedAuthors(authors=authors,
+                         authors_list=tuple(authors_list),
+                         authors_list_simple=tuple(authors_list_simple),
+                         authors_list_split=tuple(authors_list_split),
+                         authors_bibtex=' and '.join(authors_list))
+
 
 class EChoiceMetaInt(EChoiceMeta):
     def __getitem__(cls, value):
@@ -32,6 +183,7 @@ class Publication(models.Model):
 
     class Meta:
         ordering = ['-year', '-month', '-id']
+        index_together = [('year', 'month', 'id')]  # keyset pagination
         app_label = 'publications_bootstrap'  # Fix for Django<1.7
         verbose_name = 'публикацию'
         verbose_name_plural = 'публикации'
@@ -82,6 +234,8 @@ class Publication(models.Model):
     type = models.ForeignKey(Type, db_index=True, on_delete=models.CASCADE)
     citekey = NullCharField(max_length=512, blank=True, null=True, unique=True, db_index=True,
                             help_text='BibTex citation key. Leave blank if unsure.')
+    # lowercase citekey for case-insensitive lookups using the unique index, maintained on save
+    citekey_lower = NullCharField(max_length=512, null=True, unique=True, editable=False)
     title = models.CharField(max_length=512, db_index=True)
     authors = models.CharField(max_length=2048,
                                help_text='List of authors separated by commas or <i>and</i>.')
@@ -147,11 +301,27 @@ class Publication(models.Model):
                          help_text='Only for a book.')  # A-B-C-D
     status = make_echoicefield(EStatuses, default=EStatuses.PUBLISHED, blank=False)
     summary = RichTextField(blank=True, config_name='default')
-
-    def __init__(self, *args, **kwargs):
-        models.Model.__init__(self, *args, **kwargs)
-
-        # post-process tags
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    modified = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+    coins = models.TextField(blank=True, editable=False, help_text='COinS (Z39.88) of the publication, without the '
+                                                                    'version and the referrer.')
+    fingerprint = models.CharField(max_length=40, blank=True, editable=False, db_index=True,
+                                   help_text='Hash of the normalized title, family names of the authors, year and DOI '
+                                             'or ISBN, shared by possible duplicates.')
+    source_hash = models.CharField(max_length=40, blank=True, editable=False,
+                                   help_text='Hash of the BibTex entry the publication was imported from, unchanged '
+                                             'entries are skipped when imported again.')
+
+    # parsed authors, as a tuple of the parsed string and the result, see `_parsed_authors`
+    _authors_parsed = None
+
+    # BibTex key precomputed by `generate_keys`
+    _generated_key = None
+
+    def _normalize_tags(self):
+        """
+        Normalize the tags string to a comma-separated list of lowercase tags.
+        """
         self.tags = self.tags.replace(';', ',')
         self.tags = self.tags.replace(', and ', ', ')
         self.tags = self.tags.replace(',and ', ', ')
@@ -159,105 +329,55 @@ class Publication(models.Model):
         self.tags = [s.strip().lower() for s in self.tags.split(',')]
         self.tags = ', '.join(self.tags).lower()
 
-        self._produce_author_lists()
-
     def _produce_author_lists(self):
         """
-        Parse authors string to create lists of authors.
+        Normalize the authors string, see `parse_authors`.
         """
+        self.authors = self._parsed_authors.authors
 
-        # post-process author names
-        self.authors = self.authors.replace(', and ', ', ')
-        self.authors = self.authors.replace(',and ', ', ')
-        self.authors = self.authors.replace(' and ', ', ')
-        self.authors = self.authors.replace(';', ',')
-
-        # list of authors
-        self.authors_list = [author.strip() for author in self.authors.split(',')]
-
-        # simplified representation of author names
-        self.authors_list_simple = []
-
-        # author names represented as a tuple of given and family name
-        self.authors_list_split = []
-
-        # tests if title already ends with a punctuation mark
-        self.title_ends_with_punct = self.title[-1] in ['.', '!', '?'] if len(self.title) > 0 else False
+    @property
+    def _parsed_authors(self):
+        """
+        Parse the authors string on first access only, as long as it is not modified.
+        """
+        if self._authors_parsed is None or self._authors_parsed[0] != self.authors:
+            self._authors_parsed = (self.authors, parse_authors(self.authors))
+        return self._authors_parsed[1]
 
-        suffixes = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', "Jr.", "Sr."]
-        prefixes = ['Dr.']
-        prepositions = ['van', 'von', 'der', 'de', 'den']
+    @property
+    def authors_list(self):
+        """
+        List of (abbreviated) author names.
+        """
+        return self._parsed_authors.authors_list
 
-        # further post-process author names
-        for i, author in enumerate(self.authors_list):
-            if author == '':
-                continue
+    @property
+    def authors_list_simple(self):
+        """
+        Simplified representation of author names.
+        """
+        return self._parsed_authors.authors_list_simple
 
-            names = author.split(' ')
+    @property
+    def authors_list_split(self):
+        """
+        Author names represented as a tuple of given and family name.
+        """
+        return self._parsed_authors.authors_list_split
 
-            # check if last string contains initials
-            if (len(names[-1]) <= 3) \
-                    and names[-1] not in suffixes \
-                    and all(c in ascii_uppercase for c in names[-1]):
-                # turn "Gauss CF" into "C. F. Gauss"
-                names = [c + '.' for c in names[-1]] + names[:-1]
+    @property
+    def authors_bibtex(self):
+        """
+        List of authors in BibTex format.
+        """
+        return self._parsed_authors.authors_bibtex
 
-            # number of suffixes
-            num_suffixes = 0
-            for name in names[::-1]:
-                if name in suffixes:
-                    num_suffixes += 1
-                else:
-                    break
-
-            # abbreviate names
-            for j, name in enumerate(names[:-1 - num_suffixes]):
-                # don't try to abbreviate these
-                if j == 0 and name in prefixes:
-                    continue
-                if j > 0 and name in prepositions:
-                    continue
-
-                if (len(name) > 2) or (len(name) and (name[-1] != '.')):
-                    k = name.find('-')
-                    if 0 < k + 1 < len(name):
-                        # take care of dash
-                        names[j] = name[0] + '.-' + name[k + 1] + '.'
-                    else:
-                        names[j] = name[0] + '.'
-
-            if len(names):
-                self.authors_list[i] = ' '.join(names)
-
-                # create simplified/normalized representation of author name
-                if len(names) > 1:
-                    for name in names[0].split('-'):
-                        name_simple = self.simplify_name(' '.join([name, names[-1]]))
-                        self.authors_list_simple.append(name_simple)
-                else:
-                    self.authors_list_simple.append(self.simplify_name(names[0]))
-
-                # number of prepositions
-                num_prepositions = 0
-                for name in names:
-                    if name in prepositions:
-                        num_prepositions += 1
-
-                # splitting point
-                sp = 1 + num_suffixes + num_prepositions
-                self.authors_list_split.append((' '.join(names[:-sp]), ' '.join(names[-sp:])))
-
-        # list of authors in BibTex format
-        self.authors_bibtex = ' and '.join(self.authors_list)
-
-        # overwrite authors string
-        if len(self.authors_list) > 2:
-            self.authors = ', and '.join([', '.join(self.authors_list[:-1]),
-                                          self.authors_list[-1]])
-        elif len(self.authors_list) > 1:
-            self.authors = ' and '.join(self.authors_list)
-        else:
-            self.authors = self.authors_list[0]
+    @property
+    def title_ends_with_punct(self):
+        """
+        Tests if title already ends with a punctuation mark.
+        """
+        return self.title[-1] in ['.', '!', '?'] if len(self.title) > 0 else False
 
     def __unicode__(self):
         return self.__str__()
@@ -288,35 +408,72 @@ class Publication(models.Model):
     def key(self):
         warnings.warn("Signature of {0}.{1} may change or become a property in a future release.".format(
             Publication.__name__, Publication.key.__name__, ), FutureWarning)
-        from django.db.models import Count
-        # this publication's first author
-        author_lastname = self.authors_list[0].split(' ')[-1]
-
-        # SEE: https://stackoverflow.com/a/5236352/
-        publications = Publication.objects.filter(year=self.year, authors__icontains=author_lastname) \
-            .annotate(null_citekey=Count('citekey')) \
-            .annotate(null_month=Count('month')) \
-            .order_by('-null_citekey',  # Ensure publications with citekey are listed first
-                      '-null_month',  # Penalize publications without month
-                      'month', 'id')
-
-        # character to append to BibTex key
-        char = ord('a')
-
-        # augment character for every publication 'before' this publication
+        if self._generated_key is not None:
+            # precomputed by `generate_keys`
+            return self._generated_key
+        return Publication._generate_keys([self])[0]
+
+    @staticmethod
+    def _generate_keys(publications):
+        """
+        Compute the BibTex keys of the given publications with a single query.
+
+        The publications of the same year whose first authors share the same last name are grouped and ordered as
+        follows: publications with citekey first, then publications with a month, by month and by id. Each publication
+        is given the last name of its first author, the year and a character according to its position in the group.
+
+        Parameters
+        ----------
+        publications : list of Publication
+
+        Returns
+        -------
+        list of str
+            The keys, in the same order as the publications.
+        """
+
+        def lastname(authors_list):
+            return authors_list[0].split(' ')[-1]
+
+        groups = {}
+        years = set(publication.year for publication in publications)
+        if years:
+            rows = Publication.objects.filter(year__in=years).values_list('pk', 'year', 'authors', 'citekey', 'month')
+            for pk, year, authors, citekey, month in rows.iterator():
+                month = getattr(month, 'value', month)
+                groups.setdefault((year, lastname(parse_authors(authors).authors_list)), []).append(
+                    (citekey is None, month is None, month or 0, pk))
+            for group in groups.values():
+                group.sort()
+
+        keys = []
         for publication in publications:
-            if publication == self:
-                break
-            if publication.authors_list[0].split(' ')[-1] == author_lastname:
-                char += 1
+            author_lastname = lastname(publication.authors_list)
+            group = [pk for _, _, _, pk in groups.get((publication.year, author_lastname), [])]
+            # character to append to BibTex key, augmented for every publication 'before' this publication
+            char = ord('a') + (group.index(publication.pk) if publication.pk in group else len(group))
+            keys.append(author_lastname + str(publication.year) + chr(char))
+        return keys
 
-        return self.authors_list[0].split(' ')[-1] + str(self.year) + chr(char)
+    @staticmethod
+    def generate_keys(publications):
+        """
+        Precompute the BibTex keys of the publications without citekey, such that `key` issues no query.
+
+        Parameters
+        ----------
+        publications : iterable of Publication
+            For example, the publications to be exported.
+        """
+        publications = [publication for publication in publications if not publication.citekey]
+        for publication, key in zip(publications, Publication._generate_keys(publications)):
+            publication._generated_key = key
 
     def title_bibtex(self):
         warnings.warn("{0}.{1} will be a property in a future release.".format(Publication.__name__,
                                                                                Publication.title_bibtex.__name__, ),
                       FutureWarning)
-        return self.title.replace('%', r'\%')
+        return latex_escape(self.title)
 
     def month_bibtex(self):
         warnings.warn("{0}.{1} is deprecated and will be removed in a future release. "
@@ -364,26 +521,20 @@ class Publication(models.Model):
     def z3988(self):
         warnings.warn("Signature of {0}.{1} may change or become a property in a future release.".format(
             Publication.__name__, Publication.z3988.__name__, ), FutureWarning)
-        context_obj = ['ctx_ver=Z39.88-2004']
-
-        if 'django.contrib.sites' in settings.INSTALLED_APPS:
-            domain = Site.objects.get_current().domain
-        else:
-            domain = 'example.com'
+        # the COinS are stored without the referrer, which depends on the current site
+        fmt, _, coins = (self.coins or self._produce_coins()).partition('&')
+        return '&'.join(['ctx_ver=Z39.88-2004', fmt, rfr_id(), coins])
 
-        rfr_id = domain.split('.')
-
-        if len(rfr_id) > 2:
-            rfr_id = rfr_id[-2]
-        elif len(rfr_id) > 1:
-            rfr_id = rfr_id[0]
-        else:
-            rfr_id = ''
+    def _produce_coins(self):
+        """
+        Compute the COinS (Z39.88) context object of the publication, without the version and the referrer.
+        """
+        context_obj = []
 
         if self.book_title and not self.journal:
             context_obj.append('rft_val_fmt=info:ofi/fmt:kev:mtx:book')
-            context_obj.append('rfr_id=info:sid/' + domain + ':' + rfr_id)
-            context_obj.append('rft_id=info:doi/' + urlquote_plus(self.doi))
+            if self.doi:
+                context_obj.append('rft_id=info:doi/' + urlquote_plus(self.doi))
 
             context_obj.append('rft.btitle=' + urlquote_plus(self.title))
 
@@ -392,8 +543,8 @@ class Publication(models.Model):
 
         else:
             context_obj.append('rft_val_fmt=info:ofi/fmt:kev:mtx:journal')
-            context_obj.append('rfr_id=info:sid/' + domain + ':' + rfr_id)
-            context_obj.append('rft_id=info:doi/' + urlquote_plus(self.doi))
+            if self.doi:
+                context_obj.append('rft_id=info:doi/' + urlquote_plus(self.doi))
             context_obj.append('rft.atitle=' + urlquote_plus(self.title))
 
             if self.journal:
@@ -410,7 +561,7 @@ class Publication(models.Model):
 
         if self.month:
             context_obj.append(
-                'rft.date={0}-{1}-1'.format(self.year, self.month.value))
+                'rft.date={0}-{1}-1'.format(self.year, getattr(self.month, 'value', self.month)))
         else:
             context_obj.append('rft.date={0}'.format(self.year))
 
@@ -422,10 +573,41 @@ class Publication(models.Model):
 
         return '&'.join(context_obj)
 
+    def _produce_fingerprint(self):
+        """
+        Compute the fingerprint of the publication, identifying possible duplicates regardless of their formatting and
+        of their other fields.
+        """
+        title = ' '.join(re.findall(r'\w+', Publication.simplify_name(self.title)))
+        family_names = ' '.join(Publication.simplify_name(family_name) for _, family_name in self.authors_list_split)
+        identifier = (self.doi or self.isbn or '').strip().lower()
+        key = '\n'.join([title, family_names, str(self.year or ''), identifier])
+        return sha1(key.encode('utf-8')).hexdigest()
+
     def clean(self):
         if not self.citekey:
             self._produce_author_lists()
             self.citekey = self.key()
+        if Publication.objects.filter(citekey_lower=self.citekey.lower()).exclude(pk=self.pk).exists():
+            raise ValidationError({'citekey': 'A publication with this citekey, regardless of case, already exists.'})
+
+    def normalize(self):
+        """
+        Normalize the tags and authors strings, as stored in the database.
+        """
+        self._normalize_tags()
+        self._produce_author_lists()
+
+    def save(self, *args, **kwargs):
+        self.normalize()
+        self.coins = self._produce_coins()
+        self.fingerprint = self._produce_fingerprint()
+        super(Publication, self).save(*args, **kwargs)
+
+        from .author import PublicationAuthor
+        from .tag import Tag
+        PublicationAuthor.objects.index([self])
+        Tag.objects.index([self])
 
     @property
     def catalogs(self):
@@ -439,3 +621,18 @@ class Publication(models.Model):
         name = name.replace(u'ü', u'ue')
         name = name.replace(u'ß', u'ss')
         return name
+
+    @staticmethod
+    def simplify_author(author):
+        """
+        Simplified representations of a single author name, as listed in `authors_list`.
+
+        Hyphenated given names produce one representation per initial, e.g. "J.-P. Lies" is both "j. lies" and
+        "p. lies".
+        """
+        if not author:
+            return []
+        names = author.split(' ')
+        if len(names) > 1:
+            return [Publication.simplify_name(' '.join([name, names[-1]])) for name in names[0].split('-')]
+        return [Publication.simplify_name(names[0])]
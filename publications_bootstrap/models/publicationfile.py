@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from django.db import models
+from django.utils import timezone
 
 from ..models import Publication
 
@@ -12,6 +13,8 @@ class PublicationFile(models.Model):
     publication = models.ForeignKey(Publication, on_delete=models.CASCADE)
     description = models.CharField(max_length=256)
     file = models.FileField(upload_to='publications_bootstrap/')
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    modified = models.DateTimeField(default=timezone.now, editable=False)
 
     def __unicode__(self):
         return self.description
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+from django.db import models
+from django.utils.http import urlquote_plus
+
+from .author import BATCH_SIZE, _batches
+from .publication import Publication
+
+
+class TagManager(models.Manager):
+    def index(self, publications):
+        """
+        Rebuild the tag index of the given (saved) publications.
+        """
+        publications = [publication for publication in publications if publication.pk is not None]
+
+        entries = []
+        for publication in publications:
+            names = OrderedDict.fromkeys(tag.strip().lower() for tag in publication.tags.split(','))
+            entries.extend((publication.pk, name) for name in names if name)
+
+        # create missing tags
+        names = set(name for _, name in entries)
+        tags = {}
+        for batch in _batches(names):
+            tags.update(self.filter(name__in=batch).values_list('name', 'pk'))
+        missing = [name for name in names if name not in tags]
+        if missing:
+            self.bulk_create([Tag(name=name) for name in missing], batch_size=BATCH_SIZE)
+            for batch in _batches(missing):
+                tags.update(self.filter(name__in=batch).values_list('name', 'pk'))
+
+        through = Tag.publications.through
+        for batch in _batches([publication.pk for publication in publications]):
+            through.objects.filter(publication_id__in=batch).delete()
+        through.objects.bulk_create([through(publication_id=publication_id, tag_id=tags[name])
+                                     for publication_id, name in entries], batch_size=BATCH_SIZE)
+
+
+class Tag(models.Model):
+    """
+    Model representing a tag, as listed in the comma-separated tags of the publications.
+    """
+
+    class Meta:
+        ordering = ('name',)
+        app_label = 'publications_bootstrap'  # Fix for Django<1.7
+        verbose_name = 'тег'
+        verbose_name_plural = 'теги'
+
+    name = models.CharField(max_length=256, unique=True, db_index=True)
+    publications = models.ManyToManyField(Publication, blank=True)
+
+    objects = TagManager()
+
+    def __unicode__(self):
+        return self.name
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def name_escaped(self):
+        return urlquote_plus(self.name)
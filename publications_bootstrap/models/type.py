@@ -1,9 +1,91 @@
 # -*- coding: utf-8 -*-
 
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
 from django.db import models
+from django.utils import timezone
 
 from ordered_model.models import OrderedModel
 
+from ..apps import PublicationsBootstrapConfig
+
+# RIS types of the BibTex types, other BibTex types are exported as generic
+BIBTEX_TO_RIS = {
+    'article': 'JOUR',
+    'book': 'BOOK',
+    'booklet': 'PAMP',
+    'inbook': 'CHAP',
+    'conference': 'CHAP',
+    'inproceedings': 'CHAP',
+    'incollection': 'CHAP',
+    'manual': 'BOOK',
+    'masterthesis': 'THES',
+    'phdthesis': 'THES',
+    'misc': 'GEN',
+    'proceedings': 'CONF',
+    'techreport': 'RPRT',
+    'unpublished': 'UNPB',
+    'patent': 'PAT',
+    'abstract': 'ABST',
+}
+
+# MODS genres of the lowercase titles of the types, other titles are used as genre
+TITLE_TO_MODS_GENRE = {
+    'conference': 'conference publication',
+    'book chapter': 'bibliography',
+    'unpublished': 'article'
+}
+
+TypeRegistry = namedtuple('TypeRegistry', ['types', 'by_bibtex_type'])
+
+# seconds a process uses its types for, such that the types changed by another process are eventually reloaded
+DEFAULT_TYPE_REGISTRY_TIMEOUT = 60
+
+# the registry of the process and the time it was loaded
+_registry = {}
+
+
+@lru_cache(maxsize=1024)
+def _normalize_bibtex_types(bibtex_types):
+    bibtex_types = bibtex_types.replace('@', '')
+    bibtex_types = bibtex_types.replace(';', ',')
+    bibtex_types = bibtex_types.replace('and', ',')
+    bibtex_type_list = tuple(s.strip().lower() for s in bibtex_types.split(','))
+    return ', '.join(bibtex_type_list), bibtex_type_list
+
+
+def type_registry():
+    """
+    Types by id, in order, and by BibTex type, the first type in order being used for a BibTex type listed by several
+    types.
+
+    The result is cached by the process, the cache is cleared when a type is saved, reordered or deleted by the process,
+    and expires after `PUBLICATIONS_BOOTSTRAP_TYPE_REGISTRY_TIMEOUT` seconds otherwise. The types are shared, hence must
+    not be modified.
+
+    Returns
+    -------
+    TypeRegistry
+    """
+    timeout = PublicationsBootstrapConfig.defaults.get('type_registry_timeout', DEFAULT_TYPE_REGISTRY_TIMEOUT)
+    registry, loaded = _registry.get('types', (None, None))
+    if registry is not None and time.time() - loaded < timeout:
+        return registry
+
+    types = OrderedDict((publication_type.pk, publication_type) for publication_type in Type.objects.all())
+    by_bibtex_type = {}
+    for publication_type in types.values():
+        for bibtex_type in publication_type.bibtex_type_list:
+            by_bibtex_type.setdefault(bibtex_type, publication_type)
+    registry = TypeRegistry(types, by_bibtex_type)
+    _registry['types'] = (registry, time.time())
+    return registry
+
+
+type_registry.cache_clear = _registry.clear
+
 
 class Type(OrderedModel):
     class Meta:
@@ -17,6 +99,7 @@ class Type(OrderedModel):
     bibtex_types = models.CharField(max_length=256, default='article', verbose_name='BibTex types',
                                     help_text='Possible BibTex types, separated by comma.')
     hidden = models.BooleanField(default=False, db_index=True, help_text='Hide publications from main view.')
+    modified = models.DateTimeField(default=timezone.now, editable=False)
 
     def __unicode__(self):
         return self.title
@@ -27,44 +110,18 @@ class Type(OrderedModel):
     def __init__(self, *args, **kwargs):
         OrderedModel.__init__(self, *args, **kwargs)
 
-        self.bibtex_types = self.bibtex_types.replace('@', '')
-        self.bibtex_types = self.bibtex_types.replace(';', ',')
-        self.bibtex_types = self.bibtex_types.replace('and', ',')
-        self.bibtex_type_list = [s.strip().lower() for s in self.bibtex_types.split(',')]
-        self.bibtex_types = ', '.join(self.bibtex_type_list)
+        # the same few values are normalized for all the instances
+        self.bibtex_types, bibtex_type_list = _normalize_bibtex_types(self.bibtex_types)
+        self.bibtex_type_list = list(bibtex_type_list)
         self.bibtex_type = self.bibtex_type_list[0]
 
     def ris_type(self):
         # convert bibtex type to RIS type
-        bibtex2ris = {
-            'article': 'JOUR',
-            'book': 'BOOK',
-            'booklet': 'PAMP',
-            'inbook': 'CHAP',
-            'conference': 'CHAP',
-            'inproceedings': 'CHAP',
-            'incollection': 'CHAP',
-            'manual': 'BOOK',
-            'masterthesis': 'THES',
-            'phdthesis': 'THES',
-            'misc': 'GEN',
-            'proceedings': 'CONF',
-            'techreport': 'RPRT',
-            'unpublished': 'UNPB',
-            'patent': 'PAT',
-            'abstract': 'ABST',
-        }
-        return bibtex2ris.get(self.bibtex_type, 'GEN')
+        return BIBTEX_TO_RIS.get(self.bibtex_type, 'GEN')
 
     def mods_genre(self):
         """
         Guesses an appropriate MODS XML genre type.
         """
-
-        type2genre = {
-            'conference': 'conference publication',
-            'book chapter': 'bibliography',
-            'unpublished': 'article'
-        }
         tp = str(self.title).lower()
-        return type2genre.get(tp, tp)
+        return TITLE_TO_MODS_GENRE.get(tp, tp)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Serialization of publications to BibTex, RIS, MODS and plain text, without the template engine.
+
+Each function returns the same string as the rendering of the corresponding entry template, i.e.
+``publications_bootstrap/export/publication.{bib,ris,mods,txt}``.
+"""
+
+from django.utils.html import escape
+
+from .bibtex import latex_escape
+from .models import Publication
+
+__all__ = ['to_bibtex', 'to_ris', 'to_mods', 'to_plain', 'SERIALIZERS']
+
+# fields written as-is and LaTeX-escaped, in the order of the BibTex entry, see `to_bibtex`
+BIBTEX_FIELDS = (
+    ('journal', 'journal', True),
+    ('book_title', 'booktitle', True),
+    ('publisher', 'publisher', True),
+    ('location', 'address', True),
+    ('country', 'country', False),
+    ('editor', 'editor', True),
+    ('edition', 'edition', True),
+    ('institution', 'institution', True),
+    ('school', 'school', True),
+    ('organization', 'organization', True),
+    ('series', 'series', True),
+    ('volume', 'volume', False),
+    ('number', 'number', False),
+    ('chapter', 'chapter', False),
+    ('pages', 'pages', False),
+)
+
+
+def _key(publication):
+    if publication.citekey:
+        return publication.citekey
+    if publication._generated_key is not None:
+        return publication._generated_key
+    return Publication._generate_keys([publication])[0]
+
+
+def to_bibtex(publication):
+    """
+    Serialize a publication as a BibTex entry.
+
+    Parameters
+    ----------
+    publication : Publication
+
+    Returns
+    -------
+    str
+    """
+    out = ['@', publication.type.bibtex_type, '{', _key(publication), ',\n',
+           '  author = "', publication.authors_bibtex, '",\n',
+           '  title = "', latex_escape(publication.title), '",\n',
+           '  year = ', str(publication.year)]
+    for attname, field, escaped in BIBTEX_FIELDS:
+        value = getattr(publication, attname)
+        if value:
+            value = str(value)
+            out += [',\n  ', field, ' = "', latex_escape(value) if escaped else value, '"']
+    if publication.month:
+        out += [',\n  month = "', publication.month.bibtex, '"']
+    if publication.tags:
+        out += [',\n  keywords = "', latex_escape(publication.tags), '"']
+    if publication.doi:
+        out += [',\n  doi = "', publication.doi, '"']
+    if publication.url:
+        out += [',\n  url = "', publication.url, '"']
+    if publication.note:
+        out += [',\n  note = "', latex_escape(publication.note), '"']
+    if publication.isbn:
+        out += [',\n  isbn = "', publication.isbn, '"']
+    out.append('\n}\n')
+    return ''.join(out)
+
+
+def _place(publication):
+    if publication.country:
+        return escape(publication.location) + ', ' + escape(publication.country)
+    return escape(publication.location)
+
+
+def to_ris(publication):
+    """
+    Serialize a publication as a RIS entry.
+
+    Parameters
+    ----------
+    publication : Publication
+
+    Returns
+    -------
+    str
+    """
+    out = ['\nTY  - ', escape(publication.type.ris_type()),
+           '\nT1  - ', escape(publication.title)]
+    for given_name, family_name in publication.authors_list_split:
+        out += ['\nAU  - ', escape(family_name), ', ', escape(given_name)]
+    if publication.journal:
+        out += ['\nJO  - ', escape(publication.journal)]
+    if publication.book_title:
+        out += ['\nTI  - ', escape(publication.book_title)]
+    if publication.isbn:
+        out += ['\nSN  - ', escape(publication.isbn)]
+    out += ['\nPY  - ', str(publication.year)]
+    if publication.publisher:
+        out += ['\nPB  - ', escape(publication.publisher)]
+    elif publication.institution:
+        out += ['\nPB  - ', escape(publication.institution)]
+    if publication.location:
+        out += ['\nCY  - ', _place(publication)]
+    if publication.editor:
+        out += ['\nED  - ', escape(publication.editor)]
+    if publication.edition:
+        out += ['\nET  - ', escape(publication.edition)]
+    if publication.volume:
+        out += ['\nVL  - ', escape(publication.volume)]
+    if publication.number:
+        out += ['\nIS  - ', escape(publication.number)]
+    if publication.section:
+        out += ['\nSE  - ', escape(publication.section)]
+    if publication.pages:
+        pages = publication.pages.split('-')
+        out += ['\nSP  - ', escape(pages[0]), '\nEP  - ', escape(pages[-1])]
+    if publication.doi:
+        out += ['\nM3  - doi:', escape(publication.doi)]
+    if publication.url:
+        out += ['\nUR  - ', escape(publication.url)]
+    if publication.note:
+        out += ['\nN1  - ', escape(publication.note)]
+    out.append('\nER  -\n')
+    return ''.join(out)
+
+
+def to_mods(publication, media_url=''):
+    """
+    Serialize a publication as a MODS record, to be included in a `modsCollection`.
+
+    Parameters
+    ----------
+    publication : Publication
+    media_url : str
+        Prefix of the URL of the PDF, usually `settings.MEDIA_URL`.
+
+    Returns
+    -------
+    str
+    """
+    year = str(publication.year)
+    out = ['\n\t<mods version="3.2" ID="', str(publication.id), '">',
+           '\n\t\t<genre authority="marcgt">', escape(publication.type.mods_genre()), '</genre>',
+           '\n\t\t<titleInfo>\n\t\t\t<title>', escape(publication.title), '</title>\n\t\t</titleInfo>',
+           '\n\t\t<originInfo>\n\t\t\t<dateIssued>', year, '</dateIssued>']
+    if publication.publisher:
+        out += ['\n\t\t\t<publisher>', escape(publication.publisher), '</publisher>']
+    elif publication.institution:
+        out += ['\n\t\t\t<publisher>', escape(publication.institution), '</publisher>']
+    if publication.location:
+        out += ['\n\t\t\t<place>\n\t\t\t\t<placeTerm type="text">', _place(publication),
+                '</placeTerm>\n\t\t\t</place>']
+    out.append('\n\t\t\t')
+    if publication.edition:
+        out += ['\n\t\t\t<edition>', escape(publication.edition), '</edition>\n\t\t\t']
+    out.append('\n\t\t</originInfo>\n\t\t')
+    for given_name, family_name in publication.authors_list_split:
+        out += ['\n\t\t<name type="personal">\n\t\t\t<namePart type="given">', escape(given_name),
+                '</namePart>\n\t\t\t<namePart type="family">', escape(family_name), '</namePart>\n\t\t</name>\n\t\t']
+    out += ['\n\t\t<relatedItem type="host">\n\t\t\t<date>', year, '</date>\n\t\t\t']
+    journal_or_book_title = publication.journal or publication.book_title
+    if journal_or_book_title:
+        out += ['\n\t\t\t<titleInfo>\n\t\t\t\t<title>', escape(journal_or_book_title),
+                '</title>\n\t\t\t</titleInfo>\n\t\t\t']
+    out.append('\n\t\t\t<part>\n\t\t\t\t')
+    if publication.volume:
+        out += ['\n\t\t\t\t<detail type="volume">', escape(publication.volume), '</detail>\n\t\t\t\t']
+    for issue in (publication.number, publication.chapter, publication.section):
+        out.append('\n\t\t\t\t')
+        if issue:
+            out += ['\n\t\t\t\t<detail type="issue">', escape(issue), '</detail>\n\t\t\t\t']
+    out.append('\n\t\t\t\t')
+    if publication.pages:
+        pages = publication.pages.split('-')
+        out += ['\n\t\t\t\t<extent unit="page">\n\t\t\t\t\t<start>', escape(pages[0]),
+                '</start>\n\t\t\t\t\t<end>', escape(pages[-1]), '</end>\n\t\t\t\t</extent>\n\t\t\t\t']
+    out.append('\n\t\t\t</part>\n\t\t</relatedItem>\n\t\t')
+    if publication.series:
+        out += ['\n        <relatedItem type="series">\n            <titleInfo>\n                <title>',
+                escape(publication.series),
+                '</title>\n            </titleInfo>\n        </relatedItem>\n        ']
+    out.append('\n\t\t')
+    if publication.pdf:
+        out += ['\n\t\t<location>\n\t\t\t<url displayLabel="PDF" access="raw object">', escape(media_url),
+                escape(publication.pdf), '</url>\n\t\t</location>\n\t\t']
+    out.append('\n\t\t')
+    if publication.doi:
+        out += ['\n\t\t<identifier type="doi">', escape(publication.doi), '</identifier>\n\t\t']
+    out.append('\n\t\t')
+    if publication.isbn:
+        out += ['\n\t\t<identifier type="isbn">', escape(publication.isbn), '</identifier>\n\t\t']
+    out.append('\n\t\t')
+    if publication.abstract:
+        out += ['\n\t\t<abstract>', escape(publication.abstract), '</abstract>\n\t\t']
+    out.append('\n\t</mods>\n\t')
+    return ''.join(out)
+
+
+def to_plain(publication):
+    """
+    Serialize a publication as a plain text reference.
+
+    Parameters
+    ----------
+    publication : Publication
+
+    Returns
+    -------
+    str
+    """
+    out = ['\n', publication.authors, '. ', publication.title]
+    if not publication.title_ends_with_punct:
+        out.append('.')
+    for value in (publication.journal, publication.book_title, publication.publisher, publication.institution):
+        if value:
+            out += [' ', value, ',']
+    if publication.volume:
+        out += [' volume ', publication.volume, ',']
+    if publication.number:
+        out += [' issue ', publication.number, ',']
+    if publication.pages:
+        out += [' pages ', publication.pages, ',']
+    if publication.month:
+        out += [' ', str(publication.month.label)]
+    out += [' ', str(publication.year), '.\n']
+    return ''.join(out)
+
+
+# serializer of each export format, see `utils.export`
+SERIALIZERS = {
+    'bibtex': to_bibtex,
+    'ris': to_ris,
+    'mods': to_mods,
+    'plain': to_plain,
+}
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from django.utils import timezone
+
+from . import cache
+from .models import Catalog, Publication
+from .models.publication import rfr_id
+from .models.type import type_registry
+
+
+def clear_rfr_id(sender, **kwargs):
+    """
+    Clear the cached referrer of the COinS, as the domain of the site may have changed.
+    """
+    rfr_id.cache_clear()
+    cache.invalidate_cards()
+
+
+def clear_type_registry(sender, **kwargs):
+    """
+    Clear the cached types, as a type was saved, reordered or deleted.
+    """
+    type_registry.cache_clear()
+
+
+def set_modified(sender, instance, raw, **kwargs):
+    """
+    Update the modification time of a saved instance, unless loaded from a fixture.
+    """
+    if not raw:
+        instance.modified = timezone.now()
+
+
+def set_citekey_lower(sender, instance, **kwargs):
+    """
+    Update the lowercase citekey of a saved publication, also when loaded from a fixture.
+    """
+    instance.citekey_lower = instance.citekey.lower() if instance.citekey else None
+
+
+def set_title_lower(sender, instance, **kwargs):
+    """
+    Update the lowercase title of a saved catalog, also when loaded from a fixture.
+    """
+    instance.title_lower = instance.title.lower()
+
+
+def touch_publication(sender, instance, **kwargs):
+    """
+    Update the modification time of the publication of a saved or deleted link or file.
+    """
+    Publication.objects.filter(pk=instance.publication_id).update(modified=timezone.now())
+
+
+def touch_catalog_publications(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Update the modification time of the publications and catalogs whose relation changed.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        publications = [instance.pk]
+        catalogs = instance.catalog_set.values_list('pk', flat=True) if action == 'pre_clear' else pk_set
+    else:
+        catalogs = [instance.pk]
+        publications = instance.publications.values_list('pk', flat=True) if action == 'pre_clear' else pk_set
+    now = timezone.now()
+    Publication.objects.filter(pk__in=list(publications)).update(modified=now)
+    Catalog.objects.filter(pk__in=list(catalogs)).update(modified=now)
+
+
+def invalidate_pages(sender, **kwargs):
+    """
+    Invalidate the cached pages, as a publication, type, catalog, link or file changed.
+    """
+    cache.invalidate()
+
+
+def invalidate_cards(sender, **kwargs):
+    """
+    Invalidate the cached cards, as a type changed.
+    """
+    cache.invalidate_cards()
@@ -1,18 +1,30 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 from collections import OrderedDict
 from distutils.version import StrictVersion
-from re import sub
+from functools import lru_cache
 
 import django
+from django.db.models import Count, Q
 from django.template import Library, RequestContext
+from django.template.library import SimpleNode
 from django.template.loader import get_template, render_to_string
-from django.utils.html import escape
+try:
+    from django.core.urlresolvers import get_script_prefix, get_urlconf, reverse
+except ImportError:  # Django>=2.0
+    from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.html import conditional_escape, escape
+from django.utils.http import RFC3986_SUBDELIMS, urlquote
 from django.utils.safestring import mark_safe
 
 from ..apps import PublicationsBootstrapConfig
-from ..models import Publication, Catalog, Type
+from ..bibtex import latex_escape as _latex_escape
+from ..cache import card_key, get_cache
+from ..models import Publication, Catalog, Type, Tag
+from ..models.publication import DEFAULT_AUTHORS_CACHE_SIZE
+from ..models.author import _batches
 from ..utils import populate
 
 register = Library()
@@ -22,11 +34,22 @@ GREEK_LETTERS = \
     '[Ee]ta|[Tt]heta|[Ll]ambda|[Mm]u|[Nn]u|[Pp]i|[Ss]igma|[Tt]au|' + \
     '[Pp]hi|[Pp]si|[Cc]hi|[Oo]mega|[Rr]ho|[Xx]i|[Kk]appa'
 
+# TeX math, and its greek letters, subscripts and superscripts, see `tex_parse`
+TEX_MATH = re.compile(r'\$([^\$]*)\$')
+# as `_` is a word character, subscripts take precedence over superscripts of an underscore
+TEX_MATH_TOKENS = re.compile(r'\\(' + GREEK_LETTERS + r')|_(\w)|\^(?!_\w)(\w)')
+DEFAULT_TEX_PARSE_CACHE_SIZE = 4096
+
+# characters of the quoted arguments of reversed URLs, see `django.urls.resolvers`
+URL_SAFE = RFC3986_SUBDELIMS + '/~:@'
+AUTHOR_URL_PLACEHOLDER = 'author-name-placeholder'
+
 DEFAULT_MARKER = '[#1-,'
 DEFAULT_CITATION_STYLE = 'chicago'
 DEFAULT_BIBLIOGRAPHY_LAYOUT = 'card'
 DEFAULT_BIBLIOGRAPHY_TITLE = 'References'
 DEFAULT_SORTING = 'referenced'
+TAG_CLOUD_WEIGHTS = 5
 
 
 def render_template(template, request, context={}):
@@ -73,6 +96,8 @@ class CitationManger:
             bibliography = 'publications_bootstrap/bibliography/{}.html'.format(bibliography)
         self.bibliography = bibliography
         self.cited = OrderedDict()
+        # resolved publications, by normalized puid
+        self.publications = {}
 
     def cite(self, context, *puids):
         references = []
@@ -83,11 +108,23 @@ class CitationManger:
                 references.append([(r, p)])
         return render_template(self.marker, context['request'], dict(references=references, marker=self.marker_options))
 
+    def prefetch(self, *puids):
+        """
+        Resolve the given publications with a single query, for the next citations.
+        """
+        missing = [puid for puid in set(_normalize_puid(puid) for puid in puids) if puid not in self.publications]
+        if missing:
+            self.publications.update(_get_publications(missing))
+
     def nocite(self, *puids):
         from operator import itemgetter
+        self.prefetch(*puids)
         batch = []
         for puid in puids:
-            publication = _get_publication(puid)
+            try:
+                publication = self.publications[_normalize_puid(puid)]
+            except KeyError:
+                raise Publication.DoesNotExist('No publication matches "{}".'.format(puid))
             # Ref key is numeric
             batch.append(self.cited.setdefault(publication.pk, (len(self.cited.keys()) + 1, publication)))
         batch.sort(key=itemgetter(0))
@@ -108,9 +145,30 @@ class CitationManger:
 
     def clear(self):
         self.cited.clear()
+        self.publications.clear()
+
+
+CITATIONS_MANAGER = '_publications_bootstrap_citations_manager'
+
+
+def _citations_scope(context):
+    """
+    Where the citation manager of the page being rendered is kept: on the request, else on the rendering context, so
+    that concurrent renderings do not share citations.
+    """
+    request = getattr(context, 'request', None) or context.get('request')
+    if request is not None:
+        return request.__dict__
+    # shared by the included templates
+    return context.render_context.dicts[0]
 
 
-__citations_manager = None
+def _get_citations_manager(context, **kwargs):
+    scope = _citations_scope(context)
+    if scope.get(CITATIONS_MANAGER) is None:
+        # Assume new page
+        scope[CITATIONS_MANAGER] = CitationManger(**kwargs)
+    return scope[CITATIONS_MANAGER]
 
 
 def _get_publication(uid):
@@ -118,16 +176,46 @@ def _get_publication(uid):
     try:
         pbl = Publication.objects.get(pk=int(uid))
     except ValueError:
-        pbl = Publication.objects.get(citekey__iexact=uid)
+        pbl = Publication.objects.get(citekey_lower=uid.lower())
     return pbl
 
 
+def _normalize_puid(uid):
+    try:
+        return int(uid)
+    except ValueError:
+        return uid.lower()
+
+
+def _get_publications(uids):
+    """
+    Get the publications of the given normalized puids, with one query per batch of puids.
+
+    Returns
+    -------
+    dict
+        The publications found, by normalized puid.
+    """
+    pks = set(uid for uid in uids if isinstance(uid, int))
+    citekeys = set(uids) - pks
+    publications = {}
+    for batch in _batches(uids):
+        query = Q(pk__in=[uid for uid in batch if uid in pks]) | \
+                Q(citekey_lower__in=[uid for uid in batch if uid in citekeys])
+        for publication in Publication.objects.filter(query):
+            if publication.pk in pks:
+                publications[publication.pk] = publication
+            if publication.citekey_lower in citekeys:
+                publications[publication.citekey_lower] = publication
+    return publications
+
+
 def _get_catalog(id_or_title):
     # TODO: add this to a custom models.Manager
     try:
         pbl = Catalog.objects.get(pk=int(id_or_title))
     except ValueError:
-        pbl = Catalog.objects.get(title__iexact=id_or_title)
+        pbl = Catalog.objects.get(title_lower=id_or_title.lower())
     return pbl
 
 
@@ -151,6 +239,34 @@ def get_publication(context, puid, template='publications_bootstrap/components/p
         return render_template('publications_bootstrap/components/empty.html', context['request'])
 
 
+@register.simple_tag(takes_context=True)
+def publication_card(context, publication, template='publications_bootstrap/components/publication.html'):
+    """
+    Render the card of a publication, as including the template would, reusing the cached card if enabled.
+
+    The card is rendered once per modification of the publication and shared by all the pages showing it, so the
+    template should only depend on the publication.
+
+    Parameters
+    ----------
+    publication : Publication
+        With its `links` and `files`, see `utils.populate`.
+    """
+    cache = get_cache('card_cache')
+    key = None
+    if cache is not None and publication.pk is not None:
+        key = card_key(cache, publication, template)
+        card = cache.get(key)
+        if card is not None:
+            return mark_safe(card)
+
+    with context.push(publication=publication):
+        card = context.template.engine.get_template(template).render(context)
+    if key is not None:
+        cache.set(key, card)
+    return card
+
+
 @register.simple_tag(takes_context=True)
 def get_publications(context, template='publications_bootstrap/components/publications.html'):
     """
@@ -195,6 +311,31 @@ def get_catalog(context, id_or_title, template='publications_bootstrap/component
         return render_template('publications_bootstrap/components/empty.html', context['request'])
 
 
+@register.simple_tag(takes_context=True)
+def get_tag_cloud(context, limit=None, template='publications_bootstrap/components/tag_cloud.html'):
+    """
+    Get the tags of the publications, weighted by the number of publications.
+
+    Parameters
+    ----------
+    limit : int
+        Only keep the most used tags.
+    """
+    tags = Tag.objects.filter(publications__external=False).annotate(count=Count('publications'))
+    if limit:
+        tags = tags.order_by('-count', 'name')[:int(limit)]
+    tags = sorted(tags, key=lambda tag: tag.name)
+
+    if not tags:
+        return render_template('publications_bootstrap/components/empty.html', context['request'])
+
+    low = min(tag.count for tag in tags)
+    high = max(tag.count for tag in tags)
+    for tag in tags:
+        tag.weight = 1 + (TAG_CLOUD_WEIGHTS - 1) * (tag.count - low) // max(high - low, 1)
+    return render_template(template, context['request'], {'tags': tags})
+
+
 @register.simple_tag(takes_context=True)
 def get_citation(context, puid, style=DEFAULT_CITATION_STYLE):
     """
@@ -217,14 +358,16 @@ def get_citation(context, puid, style=DEFAULT_CITATION_STYLE):
     return render_template(style, context['request'], {'publication': pbl})
 
 
-@register.simple_tag(takes_context=False)
-def setup_citations(**kwargs):
+@register.simple_tag(takes_context=True)
+def setup_citations(context, **kwargs):
     """
     Define parameters for the layout of the citation marker and style and the bibliography.
-    Will remain until it is redefined with `setup_citations` or reset with `thebibliography(reset=True)`.
+    Will remain, for the current request, until it is redefined with `setup_citations` or reset with
+    `thebibliography(reset=True)`.
 
     Parameters
     ----------
+    context
     kwargs
         marker : str
             Marker specifications or path to custom template. Specifications are a mini-language:
@@ -248,8 +391,7 @@ def setup_citations(**kwargs):
         Empty string
 
     """
-    global __citations_manager
-    __citations_manager = CitationManger(**kwargs)
+    _citations_scope(context)[CITATIONS_MANAGER] = CitationManger(**kwargs)
     return ''
 
 
@@ -271,19 +413,17 @@ def cite(context, *puids, **kwargs):
     -------
 
     """
-    if __citations_manager is None:
-        # Assume new page
-        setup_citations(**kwargs)
-    return __citations_manager.cite(context, *puids)
+    return _get_citations_manager(context, **kwargs).cite(context, *puids)
 
 
-@register.simple_tag(takes_context=False)
-def nocite(*puids, **kwargs):
+@register.simple_tag(takes_context=True)
+def nocite(context, *puids, **kwargs):
     """
     Like \nocite{} in LaTeX, add the publication(s) to the bibliography but generate no marker.
 
     Parameters
     ----------
+    context
     puids
         Publication unique id, either pk or citekey.
 
@@ -293,10 +433,38 @@ def nocite(*puids, **kwargs):
         Empty string
 
     """
-    if __citations_manager is None:
-        # Assume new page
-        setup_citations(**kwargs)
-    __citations_manager.nocite(*puids)
+    _get_citations_manager(context, **kwargs).nocite(*puids)
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_citations(context, *puids, **kwargs):
+    """
+    Resolve up front, with a single query, the publications cited or nocited in the template, and the given ones, so
+    that the following `cite` and `nocite` tags do not hit the database.
+
+    Parameters
+    ----------
+    context
+    puids
+        Publication(s) unique id, either pk or citekey, typically the ones cited in included templates, which are not
+        collected.
+    kwargs
+        Same as `setup_citations`, is actually just a shortcut.
+
+    Returns
+    -------
+    str
+        Empty string
+
+    """
+    puids = list(puids)
+    for node in context.template.nodelist.get_nodes_by_type(SimpleNode):
+        if node.func in (cite, nocite):
+            # variables which cannot be resolved yet, e.g. loop variables, are looked up by the tag itself
+            puids += [puid for puid in (arg.resolve(context, ignore_failures=True) for arg in node.args)
+                      if puid is not None]
+    _get_citations_manager(context, **kwargs).prefetch(*puids)
     return ''
 
 
@@ -310,7 +478,7 @@ def thebibliography(context, clear=True, reset=False, **kwargs):
     context
     clear : bool
         Clear the references of cited publications. Else, the next bibliography will also contain the publications
-        listed here, as the references persist through the templates.
+        listed here, as the references persist through the templates rendered for the same request.
     reset : bool
         The next bibliography will be generated using new settings. Otherwise, the next bibliographies will all use the
         same parameters as this one, unless `setup_citations` is used.
@@ -321,31 +489,51 @@ def thebibliography(context, clear=True, reset=False, **kwargs):
     -------
 
     """
-    global __citations_manager
-    bibliography = __citations_manager.thebibliography(context, **kwargs)
+    citations_manager = _get_citations_manager(context)
+    bibliography = citations_manager.thebibliography(context, **kwargs)
     if clear:
-        __citations_manager.clear()
+        citations_manager.clear()
     if reset:
-        __citations_manager = None
+        _citations_scope(context).pop(CITATIONS_MANAGER, None)
     return bibliography
 
 
+def _tex_math_token(match):
+    greek_letter, subscript, superscript = match.groups()
+    if greek_letter:
+        return '&' + greek_letter + ';'
+    if subscript:
+        return '<sub>' + subscript + '</sub>'
+    return '<sup>' + superscript + '</sup>'
+
+
+def _tex_math(match):
+    return TEX_MATH_TOKENS.sub(_tex_math_token, match.group(1))
+
+
+@lru_cache(maxsize=PublicationsBootstrapConfig.defaults.get('tex_parse_cache_size', DEFAULT_TEX_PARSE_CACHE_SIZE))
+def _tex_parse(string):
+    # braces are dropped, so that grouped subscripts and superscripts are reduced to their first character
+    return TEX_MATH.sub(_tex_math, escape(string.replace('{', '').replace('}', '')))
+
+
 @register.filter()
 def tex_parse(string):
     """
     Renders some basic TeX math to HTML.
+
+    The same titles and abstracts being rendered over and over, the results are kept in a process-wide cache, see
+    `_tex_parse.cache_info()`.
     """
-    string = string.replace('{', '').replace('}', '')
+    return mark_safe(_tex_parse(string))
 
-    def tex_replace(match):
-        return \
-            sub(r'\^(\w)', r'<sup>\1</sup>',
-                sub(r'\^\{(.*?)\}', r'<sup>\1</sup>',
-                    sub(r'\_(\w)', r'<sub>\1</sub>',
-                        sub(r'\_\{(.*?)\}', r'<sub>\1</sub>',
-                            sub(r'\\(' + GREEK_LETTERS + ')', r'&\1;', match.group(1))))))
 
-    return mark_safe(sub(r'\$([^\$]*)\$', tex_replace, escape(string)))
+@register.filter()
+def latex_escape(string):
+    """
+    Escapes the characters with a special meaning in LaTeX, for BibTex fields.
+    """
+    return _latex_escape(str(string))
 
 
 @register.filter(is_safe=False)
@@ -355,14 +543,63 @@ def as_list(o):
 
 @register.filter()
 def flatten_authors(authors, args=None):
+    """
+    Render the linked authors of a publication, i.e. `Publication.authors_escaped`.
+
+    The options are given as a query string: `limit` (default: 8, 0 for no limit), `separator` (default: ','), `last`
+    (separator before the last author, if all are listed), `et_al` (appended when the authors are truncated) and
+    `template`. The authors are rendered in Python, as the default template would, unless a template is given.
+    """
+    limit, separator, last, et_al, template = _flatten_authors_options(args)
+    complete = not limit or limit >= len(authors)
+    if template is not None:
+        return render_to_string(template, dict(authors=authors, limit=str(limit or ''), separator=separator,
+                                               last=last if complete else separator, et_al=et_al))
+
+    shown = authors[:limit] if limit else authors
+    url = _author_url()
+    separator = conditional_escape(separator) + '\n'
+    out = []
+    for i, (author, author_escaped) in enumerate(shown, 2 - len(shown)):
+        out.append(_author_link(url, author, author_escaped))
+        # i is 0 for the second to last author
+        if i == 0:
+            out.append(conditional_escape(last) + '\n' if complete else separator)
+        elif i < 0:
+            out.append(separator)
+    if not complete:
+        out.append(et_al)
+    return mark_safe(''.join(out))
+
+
+@lru_cache(maxsize=64)
+def _flatten_authors_options(args):
+    """
+    Options of `flatten_authors`, parsed once per distinct query string.
+    """
     from django.http import QueryDict
     qs = QueryDict(args)
     separator = qs.get('separator', ',')
     limit = max(int(qs.get('limit', 8)), 0)
-    # 'last' is ignored if it can not be applied (limit < #authors)
-    last = qs.get('last', separator) if not limit or limit >= len(authors) else separator
-    limit = limit if limit > 0 else ''
-    et_al = qs.get('et_al', ',&nbsp;<i>et al.</i>')
-    template = qs.get('template', 'publications_bootstrap/filters/authors.html')
-    return render_to_string(template,
-                            dict(authors=authors, limit=str(limit), separator=separator, last=last, et_al=et_al))
+    return limit, separator, qs.get('last', separator), qs.get('et_al', ',&nbsp;<i>et al.</i>'), qs.get('template')
+
+
+@lru_cache(maxsize=PublicationsBootstrapConfig.defaults.get('authors_cache_size', DEFAULT_AUTHORS_CACHE_SIZE))
+def _author_link(url, author, author_escaped):
+    prefix, suffix = url
+    return '<a href="{}">{}</a>'.format(conditional_escape(prefix + urlquote(author_escaped, safe=URL_SAFE) + suffix),
+                                       conditional_escape(author))
+
+
+def _author_url():
+    """
+    URL of the page of an author, as the parts before and after the quoted name, see `reverse`.
+    """
+    return _author_url_parts(get_script_prefix(), get_urlconf())
+
+
+@lru_cache(maxsize=None)
+def _author_url_parts(script_prefix, urlconf):
+    url = reverse('publications_bootstrap:author', args=[AUTHOR_URL_PLACEHOLDER])
+    prefix, suffix = url.split(AUTHOR_URL_PLACEHOLDER)
+    return prefix, suffix
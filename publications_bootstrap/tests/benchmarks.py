@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks, not collected by the test runner.
+
+Run all of them with ``python -m publications_bootstrap.tests.benchmarks``, or only some with
+``python -m publications_bootstrap.tests.benchmarks instantiation ...``.
+"""
+
+import os
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+from timeit import default_timer
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publications_bootstrap.tests.settings')
+
+AUTHORS = [
+    u'A. S. Ecker, P. Berens, R. J. Cotton, M. Subramaniyan, G. H. Denfield, C. R. Cadwell, S. M. Smirnakis, '
+    u'M. Bethge, and A. S. Tolias',
+    u'A. Chagas, L. Theis, B. Sengupta, M. Stüttgen, M. Bethge, and C. Schwarz',
+    u'Jörn-Philipp Lies and Ralf M. Häfner and M. Bethge',
+    u'Last-Name, First and Peter van der Markt III and Test and Gauss II CF',
+]
+
+
+def _report(name, count, seconds):
+    print('{:<40} {:>10.2f} us/item {:>12.0f} items/s'.format(name, seconds / count * 1e6, count / seconds))
+
+
+def _rows(count):
+    """
+    Database rows of publications, as fed by the ORM to `Model.from_db`.
+    """
+    from ..models import Publication
+
+    field_names = [f.attname for f in Publication._meta.concrete_fields]
+    rows = []
+    for i in range(count):
+        values = dict(id=i + 1, type_id=1, citekey='Key{}'.format(i), title='Title {}.'.format(i),
+                      authors=AUTHORS[i % len(AUTHORS)], year=2000 + i % 20, month=1 + i % 12,
+                      tags='tag {}, other tag'.format(i % 50), external=False, status='p')
+        rows.append([values.get(name, '') for name in field_names])
+    return field_names, rows
+
+
+def bench_instantiation(count=10000):
+    """
+    Instantiation of publications loaded from the database, with and without reading the lists of authors.
+    """
+    from ..models import Publication
+
+    field_names, rows = _rows(count)
+
+    start = default_timer()
+    for row in rows:
+        Publication.from_db('default', field_names, row)
+    _report('instantiation', count, default_timer() - start)
+
+    start = default_timer()
+    for row in rows:
+        publication = Publication.from_db('default', field_names, row)
+        publication.authors_list
+        publication.authors_list_split
+    _report('instantiation + authors lists', count, default_timer() - start)
+
+
+def bench_export(count=2000):
+    """
+    Serialization of publications for the exports, with the entry templates and with the Python serializers.
+    """
+    import warnings
+    from django.template import Context, Engine
+    from ..models import Publication, Type
+    from ..serializers import SERIALIZERS
+
+    field_names, rows = _rows(count)
+    publication_type = Type(title='Journal article', bibtex_types='article')
+    publications = []
+    for row in rows:
+        publication = Publication.from_db('default', field_names, row)
+        publication.type = publication_type
+        # the database converters are not applied by `from_db`
+        publication.month = Publication.EMonths(publication.month)
+        publications.append(publication)
+
+    engine = Engine.get_default()
+    for fmt, ext, autoescape in (('bibtex', 'bib', False), ('ris', 'ris', True), ('mods', 'mods', True),
+                                 ('plain', 'txt', False)):
+        template = engine.get_template('publications_bootstrap/export/publication.{}'.format(ext))
+        context = Context(autoescape=autoescape)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            start = default_timer()
+            for publication in publications:
+                with context.push(publication=publication):
+                    template.render(context)
+            _report('export {} (template)'.format(fmt), count, default_timer() - start)
+
+        serialize = SERIALIZERS[fmt]
+        start = default_timer()
+        for publication in publications:
+            serialize(publication)
+        _report('export {} (serializer)'.format(fmt), count, default_timer() - start)
+
+
+def bench_tex_parse(count=2000):
+    """
+    Rendering of the TeX math of abstract-length texts, all distinct and then all cached.
+    """
+    from ..templatetags.publication_extras import _tex_parse, tex_parse
+
+    abstracts = [u'Sample {} of an abstract with $L_p$-spherical and $\\alpha^2$ math, <i>escaped</i>. '.format(i) * 12
+                 for i in range(count)]
+
+    _tex_parse.cache_clear()
+    start = default_timer()
+    for abstract in abstracts:
+        tex_parse(abstract)
+    _report('tex_parse (uncached)', count, default_timer() - start)
+
+    start = default_timer()
+    for abstract in abstracts:
+        tex_parse(abstract)
+    _report('tex_parse (cached)', count, default_timer() - start)
+
+
+def _parse_regex(string):
+    """
+    Former implementation of `bibtex.parse`, replacing the special characters one after the other and splitting the
+    entries and fields with regular expressions.
+    """
+    from ..bibtex import special_chars
+
+    bib = []
+    for key, value in special_chars:
+        string = string.replace(key, value)
+    string = re.sub(r'\\[cuHvs]{?([a-zA-Z])}?', r'\1', string)
+    entries = re.findall(
+        r'(?u)@(\w+)[ \t]?{[ \t]*([^,\s]*)[ \t]*,?\s*((?:[^=,\s]+\s*\=\s*(?:"[^"]*"|{(?:[^{}]*|{[^{}]*})*}|[^,}]*),?\s*?)+)\s*}',
+        string)
+    for entry in entries:
+        pairs = re.findall(r'(?u)([^=,\s]+)\s*\=\s*("[^"]*"|{(?:[^{}]*|{[^{}]*})*}|[^,]*)', entry[2])
+        bib.append({'type': entry[0].lower(), 'key': entry[1]})
+        for key, value in pairs:
+            key = key.lower()
+            if value and value[0] == '"' and value[-1] == '"':
+                value = value[1:-1]
+            if value and value[0] == '{' and value[-1] == '}':
+                value = value[1:-1]
+            if key not in ['booktitle', 'title']:
+                value = value.replace('}', '').replace('{', '')
+            elif value.startswith('{') and value.endswith('}'):
+                value = value[1:-1]
+            bib[-1][key] = re.sub(r'\s+', ' ', value.strip())
+    return bib
+
+
+def bench_bibtex(size=50 * 2 ** 20):
+    """
+    Parsing of a synthetic bibliography of about `size` bytes, with regular expressions and with the tokenizer.
+    """
+    from ..bibtex import iterparse
+
+    with tempfile.TemporaryFile() as bib:
+        count = 0
+        while bib.tell() < size:
+            # nested no deeper than supported by the regular expressions
+            entry = (u'@article{{Key{0},\n  title = {{On the {{MAP}} estimation of $L_p$-spherical models, part {0}}},\n'
+                     u'  author = {{{1}}},\n  journal = "J. M\\"{{u}}nch. Res.",\n  year = {2},\n  abstract = {{{3}}}\n}}\n\n'
+                     ).format(count, AUTHORS[count % len(AUTHORS)], 2000 + count % 20,
+                              u'A long abstract, with \\c{c} and {braces}. ' * 8)
+            bib.write(entry.encode('utf-8'))
+            count += 1
+
+        bib.seek(0)
+        start = default_timer()
+        _parse_regex(bib.read().decode('utf-8'))
+        _report('bibtex (regular expressions)', count, default_timer() - start)
+
+        bib.seek(0)
+        start = default_timer()
+        for entry in iterparse(bib):
+            pass
+        _report('bibtex (tokenizer)', count, default_timer() - start)
+
+
+BENCHMARKS = OrderedDict([
+    ('instantiation', bench_instantiation),
+    ('export', bench_export),
+    ('tex_parse', bench_tex_parse),
+    ('bibtex', bench_bibtex),
+])
+
+if __name__ == '__main__':
+    django.setup()
+
+    for name in sys.argv[1:] or BENCHMARKS:
+        print('# {}'.format(name))
+        BENCHMARKS[name]()
@@ -1,16 +1,29 @@
 # -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
 import warnings
 from distutils.version import StrictVersion
 
 import django
 from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
 from django.core.urlresolvers import reverse
+from django.db import transaction
 from django.http import HttpRequest
 from django.template import Template, RequestContext
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+from django.utils.six import StringIO
 
-from ..models import Publication, Type, PublicationLink, Catalog
+from ..bibtex import parse, iterparse
+from ..models import ImportJob, Publication, Type, PublicationLink, Catalog, PublicationAuthor, Tag
 from ..templatetags.publication_extras import tex_parse
+from ..utils import import_bibtex, import_bibtex_batches, process_import_job
 
 warnings.simplefilter("always")
 
@@ -34,6 +47,68 @@ class Tests(TestCase):
         self.assertTrue('J.-P. Lies' in publication.authors_list)
         self.assertTrue(('J.-P.', 'Lies') in publication.authors_list_split)
 
+    def test_parse_authors(self):
+        from ..models.publication import parse_authors
+
+        parse_authors.cache_clear()
+        parsed = parse_authors(u'Jörn-Philipp Lies and Ralf M. Häfner and M. Bethge')
+        self.assertEqual(parsed.authors, u'J.-P. Lies, R. M. Häfner, and M. Bethge')
+        self.assertEqual(parsed.authors_list, (u'J.-P. Lies', u'R. M. Häfner', u'M. Bethge'))
+        self.assertEqual(parsed.authors_list_simple, (u'j. lies', u'p. lies', u'r. haefner', u'm. bethge'))
+        self.assertEqual(parsed.authors_bibtex, u'J.-P. Lies and R. M. Häfner and M. Bethge')
+        self.assertIs(parse_authors(u'Jörn-Philipp Lies and Ralf M. Häfner and M. Bethge'), parsed)
+        self.assertEqual(parse_authors.cache_info().hits, 1)
+        self.assertEqual(parse_authors.cache_info().misses, 1)
+
+    def test_author_index(self):
+        publication = Publication.objects.create(
+            type=Type.objects.get(pk=1),
+            authors=u'Jörn-Philipp Lies and Ralf M. Häfner and M. Bethge',
+            title=u'Slowness and sparseness have diverging effects on complex cell learning',
+            year=2014,
+            journal=u'PLoS Computational Biology',
+            external=0)
+
+        index = PublicationAuthor.objects.filter(publication=publication)
+        self.assertEqual([(pa.position, pa.author.name_simple) for pa in index],
+                         [(0, 'j. lies'), (0, 'p. lies'), (1, 'r. haefner'), (2, 'm. bethge')])
+
+        publication.authors = u'M. Bethge and J. Lies'
+        publication.save()
+
+        index = PublicationAuthor.objects.filter(publication=publication)
+        self.assertEqual([(pa.position, pa.author.name_simple) for pa in index], [(0, 'm. bethge'), (1, 'j. lies')])
+        self.assertEqual(list(Publication.objects.filter(author__name_simple='r. haefner')), [])
+
+    def test_tag_index(self):
+        publication = Publication.objects.create(
+            type=Type.objects.get(pk=1),
+            authors=u'A. Unique',
+            title=u'Networks',
+            year=2014,
+            journal=u'Journal',
+            tags=u'Network; noise correlations, Noise Correlations',
+            external=0)
+
+        self.assertEqual([tag.name for tag in publication.tag_set.all()], ['network', 'noise correlations'])
+        response = self.client.get('/publications/tag/noise+correlations/')
+        self.assertIn(publication, response.context['publications'])
+        # no substring matches
+        self.assertEqual(self.client.get('/publications/tag/net/').context['publications'], [])
+
+        # a plus in a tag is not a space
+        publication.tags = u'C++, c'
+        publication.save()
+        url = reverse('publications_bootstrap:tag', args=[Tag.objects.get(name='c++').name_escaped])
+        response = self.client.get(url)
+        self.assertEqual((response.context['publications'], response.context['tag']), ([publication], 'c++'))
+
+        publication.tags = u'sparseness'
+        publication.save()
+
+        self.assertEqual([tag.name for tag in publication.tag_set.all()], ['sparseness'])
+        self.assertNotIn(publication, Tag.objects.get(name='network').publications.all())
+
     def test_citekey(self):
         publication = Publication.objects.create(
             type=Type.objects.get(pk=1),
@@ -96,6 +171,76 @@ class Tests(TestCase):
 
         self.assertEqual(publication.citekey, 'Unique2013c')
 
+    def test_citekey_lower(self):
+        from django.core.exceptions import ValidationError
+        from django.db import connection
+        from ..templatetags.publication_extras import _get_catalog, _get_publication
+
+        # maintained when loading fixtures
+        self.assertEqual(Publication.objects.get(pk=1).citekey_lower, 'ecker2014a')
+        self.assertEqual(_get_publication('ECKER2014A').pk, 1)
+        self.assertEqual(_get_catalog('HIGHLIGHTS').title_lower, 'highlights')
+        self.assertEqual(self.client.get('/publications/unapi/?id=ecker2014A&format=bibtex').status_code, 200)
+
+        publication = Publication(type=Type.objects.get(pk=1), authors=u'A. Unique', title=u'Title', year=2014,
+                                  citekey=u'ECKER2014A', external=0)
+        self.assertRaises(ValidationError, publication.clean)
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is specific to SQLite.')
+        for queryset in (Publication.objects.filter(citekey_lower='ecker2014a'),
+                         Catalog.objects.filter(title_lower='highlights')):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            self.assertIn('USING INDEX', plan)
+
+    def test_generate_keys(self):
+        for title, month in ((u'Title 1', None), (u'Title 2', Publication.EMonths.MAY), (u'Title 3', None)):
+            Publication.objects.create(type=Type.objects.get(pk=1), authors=u'A. Unique and B. Common', title=title,
+                                       year=2014, month=month, journal=u'Journal', external=0)
+        publications = list(Publication.objects.filter(authors__startswith='A. Unique'))
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            keys = [publication.key() for publication in publications]
+            with self.assertNumQueries(1):
+                Publication.generate_keys(publications)
+            with self.assertNumQueries(0):
+                self.assertEqual([publication.key() for publication in publications], keys)
+        self.assertEqual(sorted(keys), ['Unique2014a', 'Unique2014b', 'Unique2014c'])
+        self.assertEqual(Publication.objects.get(title=u'Title 2').key(), 'Unique2014a')
+
+        from django.core.management import call_command
+        from django.utils.six import StringIO
+        call_command('assign_citekeys', stdout=StringIO())
+        self.assertFalse(Publication.objects.filter(citekey__isnull=True).exists())
+        self.assertEqual(
+            list(Publication.objects.filter(authors__startswith='A. Unique').order_by('title')
+                 .values_list('citekey', flat=True)),
+            ['Unique2014b', 'Unique2014a', 'Unique2014c'])
+
+    def test_z3988(self):
+        publication = Publication.objects.create(
+            type=Type.objects.get(pk=1),
+            authors=u'A. Unique and B. Common',
+            title=u'Title, 1',
+            year=2014,
+            month=Publication.EMonths.MAY,
+            journal=u'Journal',
+            volume='7',
+            external=0)
+
+        self.assertTrue(publication.coins)
+        publication = Publication.objects.get(pk=publication.pk)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            with self.assertNumQueries(0):
+                self.assertEqual(publication.z3988(),
+                                 'ctx_ver=Z39.88-2004&rft_val_fmt=info:ofi/fmt:kev:mtx:journal'
+                                 '&rfr_id=info:sid/example.com:example&rft.atitle=Title%2C+1'
+                                 '&rft.jtitle=Journal&rft.volume=7&rft.date=2014-5-1&rft.au=A.+Unique&rft.au=B.+Common')
+
     def test_month(self):
         publication = Publication.objects.create(
             type=Type.objects.get(pk=1),
@@ -129,6 +274,164 @@ class Tests(TestCase):
         self.assertEqual(self.client.get('/publications/').status_code, 200)
         self.assertEqual(self.client.get('/publications/1/').status_code, 200)
 
+    def test_pagination(self):
+        from unittest import mock
+        from ..apps import PublicationsBootstrapConfig
+
+        for i, month in enumerate((None, Publication.EMonths.MAY, None, Publication.EMonths.JAN, None)):
+            Publication.objects.create(type=Type.objects.get(pk=1), authors=u'A. Unique', title=u'Title {}'.format(i),
+                                       year=2011, month=month, journal=u'Journal', external=0)
+        expected = list(Publication.objects.filter(external=False, type__hidden=False)
+                        .order_by('-year', '-month', '-id').values_list('pk', flat=True))
+
+        listed = []
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'page_size': 2}):
+            response = self.client.get('/publications/')
+            while True:
+                self.assertLessEqual(len(response.context['publications']), 2)
+                listed.extend(publication.pk for publication in response.context['publications'])
+                if not response.context['next']:
+                    break
+                response = self.client.get('/publications/', {'after': response.context['next']})
+        self.assertEqual(listed, expected)
+        self.assertEqual(self.client.get('/publications/', {'after': 'foo'}).status_code, 404)
+
+    def test_export(self):
+        response = self.client.get('/publications/?bibtex')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/x-bibtex; charset=UTF-8')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content.count('\n@'), Publication.objects.filter(external=False).count())
+
+        response = self.client.get('/publications/1/?mods')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('<?xml version="1.0" encoding="UTF-8"?>'))
+        self.assertTrue(content.endswith('</modsCollection>\n'))
+
+        # an overridden list template renders the whole export
+        from django.conf import settings
+        from django.test import override_settings
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        os.makedirs(os.path.join(directory, 'publications_bootstrap', 'export'))
+        with open(os.path.join(directory, 'publications_bootstrap', 'export', 'publications.ris'), 'w') as f:
+            f.write('{% for publication in publications %}{{ publication.type.title }}: {{ publication.title }}\n'
+                    '{% endfor %}')
+        templates = [dict(settings.TEMPLATES[0], DIRS=[directory])]
+        with override_settings(TEMPLATES=templates):
+            response = self.client.get('/publications/?ris')
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-research-info-systems; charset=UTF-8')
+        self.assertEqual(response.content.decode('utf-8').count('\n'),
+                         Publication.objects.filter(external=False).count())
+        self.assertIn('Journal: State dependence of noise correlations', response.content.decode('utf-8'))
+
+    def test_serializers(self):
+        from django.template import Context, Engine
+        from ..serializers import SERIALIZERS
+
+        Publication.objects.create(
+            type=Type.objects.get(pk=1), authors=u'Jörn-Philipp Lies and Ralf M. Häfner and M. Bethge',
+            title=u'85% of <b>"A & B"</b> #1', year=2014, month=Publication.EMonths.MAY, journal=u'A & B',
+            book_title=u'Book', publisher=u'Publisher', institution=u'Institution', location=u'Location',
+            country='CH', editor=u'Editor', edition=u'2nd', school=u'School', organization=u'Organization',
+            series=u'Series', volume='7', number='3', chapter='2', section='1', pages='10-12', note=u'100% note',
+            tags=u'tag, other tag', url='http://example.com/?a=1&b=2', doi='10.1000/xyz', isbn='1-2-3-4',
+            abstract=u'Abstract <i>with</i> markup', pdf='publications_bootstrap/paper.pdf', external=0)
+        Publication.objects.create(type=Type.objects.get(pk=2), authors=u'A. Unique', title=u'Title?', year=2013,
+                                   book_title=u'Book', institution=u'Institution', location=u'Location')
+
+        engine = Engine.get_default()
+        for fmt, ext, autoescape in (('bibtex', 'bib', False), ('ris', 'ris', True), ('mods', 'mods', True),
+                                     ('plain', 'txt', False)):
+            template = engine.get_template('publications_bootstrap/export/publication.{}'.format(ext))
+            for publication in Publication.objects.all():
+                Publication.generate_keys([publication])
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    expected = template.render(Context({'publication': publication}, autoescape=autoescape))
+                self.assertEqual(SERIALIZERS[fmt](publication), expected)
+
+    def test_bibtex_parse(self):
+        bib = parse(TEST_BIBLIOGRAPHY)
+        self.assertEqual(len(bib), TEST_BIBLIOGRAPHY_COUNT)
+        self.assertEqual(list(iterparse(io.BytesIO(TEST_BIBLIOGRAPHY.encode('utf-8')))), bib)
+        self.assertEqual(bib[0], {'type': 'article', 'key': 'Bethge2002c',
+                                  'author': 'M. Bethge and D. Rotermund and K. Pawelzik',
+                                  'title': 'Optimal short-term population coding: when Fisher information fails',
+                                  'year': '2002', 'journal': 'Neural Computation', 'month': 'Oct',
+                                  'keywords': 'population coding, fisher information',
+                                  'doi': '10.1162/08997660260293247',
+                                  'url': 'http://www.mitpressjournals.org/doi/abs/10.1162/08997660260293247'})
+
+        # accents, nested braces and entries spanning several lines
+        bib = iterparse(io.StringIO(u'@comment{ignored}\n@Book{Key, title = {{On {the {MAP}}} in\n  M\\"{u}nchen},\n'
+                                    u'  author = "J. Fran\\c{c}ois and \\AA{}ke", note = {a, b} }'))
+        self.assertEqual(list(bib), [{'type': 'book', 'key': 'Key', 'title': u'{On {the {MAP}}} in München',
+                                      'author': u'J. François and Åke', 'note': 'a, b'}])
+
+        # an unclosed brace ends the entry at the next one, which is still read
+        self.assertEqual(parse('@article{k, title={x}\n@article{j, title={y}}'),
+                         [{'type': 'article', 'key': 'k', 'title': 'x'}, {'type': 'article', 'key': 'j', 'title': 'y'}])
+
+    def test_conditional_get(self):
+        response = self.client.get('/publications/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get('/publications/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get('/publications/?bibtex')['ETag'], etag)
+
+        # changes to links and files are changes to their publication
+        PublicationLink.objects.create(publication_id=1, description='Test', url='http://test.com')
+        response = self.client.get('/publications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # so are changes to the types shown along with the publications, and deletions
+        etag = response['ETag']
+        publication_type = Publication.objects.get(pk=1).type
+        publication_type.title = 'Renamed'
+        publication_type.save()
+        response = self.client.get('/publications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Publication.objects.filter(pk=3).delete()
+        self.assertEqual(self.client.get('/publications/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        catalog = Catalog.objects.get(title__iexact='highlights')
+        catalog.publications.add(1, 2)
+        etag = self.client.get('/publications/catalog/highlights/')['ETag']
+        catalog.publications.remove(1)
+        self.assertEqual(self.client.get('/publications/catalog/highlights/', HTTP_IF_NONE_MATCH=etag).status_code,
+                         200)
+
+    def test_card_cache(self):
+        from unittest import mock
+        from django.test import override_settings
+        from ..apps import PublicationsBootstrapConfig
+
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                  'cards': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'cards'}}
+        with override_settings(CACHES=caches), \
+                mock.patch.dict(PublicationsBootstrapConfig.defaults, {'card_cache': 'cards'}):
+            content = self.client.get('/publications/').content
+            self.assertEqual(self.client.get('/publications/').content, content)
+
+            # the cached card is reused until the publication is saved
+            Publication.objects.filter(pk=1).update(title=u'Uncached title')
+            self.assertNotIn(b'Uncached title', self.client.get('/publications/').content)
+            self.assertNotIn(b'Uncached title', self.client.get('/publications/1/').content.split(b'<pre')[0])
+            PublicationLink.objects.create(publication_id=1, description='Test link', url='http://test.com')
+            content = self.client.get('/publications/').content
+            self.assertIn(b'Uncached title', content)
+            self.assertIn(b'Test link', content)
+
+            Publication.objects.filter(pk=1).update(title=u'Another title')
+            Type.objects.get(pk=1).save()
+            self.assertIn(b'Another title', self.client.get('/publications/').content)
+
     def test_publications(self):
         publication = Publication.objects.create(
             type=Type.objects.get(pk=1),
@@ -231,6 +534,95 @@ class Tests(TestCase):
         self.assertEqual(self.client.get('/publications/unapi/?id=1&format=foobar').status_code, 406)
 
 
+    def test_type_registry(self):
+        from ..models.type import type_registry
+        from ..utils import export
+
+        article = type_registry().by_bibtex_type['article']
+        with self.assertNumQueries(0):
+            self.assertIs(type_registry().by_bibtex_type['article'], article)
+            self.assertEqual(article.ris_type(), 'JOUR')
+
+        # the registry is cleared when a type is saved, reordered or deleted
+        dataset = Type.objects.create(title='Dataset', description='Dataset', bibtex_types='@Dataset; article')
+        self.assertEqual(dataset.bibtex_type_list, ['dataset', 'article'])
+        self.assertEqual(type_registry().by_bibtex_type['dataset'].pk, dataset.pk)
+        self.assertEqual(type_registry().by_bibtex_type['article'].pk, article.pk)
+        dataset.top()
+        self.assertEqual(type_registry().by_bibtex_type['article'].pk, dataset.pk)
+        dataset.delete()
+        self.assertEqual(type_registry().by_bibtex_type['article'].pk, article.pk)
+        self.assertNotIn('dataset', type_registry().by_bibtex_type)
+
+        # the types changed by another process are reloaded once the registry expires
+        from unittest import mock
+        from ..apps import PublicationsBootstrapConfig
+        Type.objects.filter(pk=article.pk).update(bibtex_types='journal')
+        self.assertEqual(type_registry().by_bibtex_type['article'].pk, article.pk)
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'type_registry_timeout': 0}):
+            self.assertNotIn('article', type_registry().by_bibtex_type)
+            self.assertEqual(type_registry().by_bibtex_type['journal'].pk, article.pk)
+        Type.objects.filter(pk=article.pk).update(bibtex_types='article')
+        type_registry.cache_clear()
+
+        # the exported publications share the types of the registry
+        type_registry()
+        with self.assertNumQueries(1):
+            ris = b''.join(export(HttpRequest(), Publication.objects.all(), 'ris').streaming_content)
+        self.assertEqual(ris.count(b'TY  - JOUR'), Publication.objects.filter(type=article).count())
+
+
+
+class PageCacheTests(TransactionTestCase):
+    # the cached pages are invalidated once the changes are committed
+    fixtures = ['initial_data.json', 'test_data.json']
+
+    def test_page_cache(self):
+        from unittest import mock
+        from django.test import override_settings
+        from .. import cache
+        from ..apps import PublicationsBootstrapConfig
+        from ..compat import is_authenticated
+
+        # anonymous users are told apart on Django<1.10 too, where is_authenticated is a method
+        self.assertFalse(is_authenticated(mock.Mock(is_authenticated=lambda: False)))
+        self.assertFalse(is_authenticated(mock.Mock(is_authenticated=False)))
+
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                  'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'}}
+        with override_settings(CACHES=caches), \
+                mock.patch.dict(PublicationsBootstrapConfig.defaults, {'page_cache': 'pages'}):
+            content = self.client.get('/publications/').content
+            bibtex = b''.join(self.client.get('/publications/?bibtex').streaming_content)
+            # only the validators of the conditional GETs are computed, with three queries per request
+            with self.assertNumQueries(6):
+                self.assertEqual(self.client.get('/publications/').content, content)
+                self.assertEqual(self.client.get('/publications/?bibtex').content, bibtex)
+            self.assertEqual(cache.stats()['by_year'], (2, 2, 0.5))
+
+            publication = Publication.objects.get(pk=1)
+            publication.title = u'Cached title'
+            generation = cache._generation(cache.get_cache())
+            with transaction.atomic():
+                publication.save()
+                self.assertEqual(cache._generation(cache.get_cache()), generation)
+            self.assertNotEqual(cache._generation(cache.get_cache()), generation)
+            self.assertIn(b'Cached title', self.client.get('/publications/').content)
+            Catalog.objects.get(title__iexact='highlights').publications.add(1)
+            self.assertEqual(self.client.get('/publications/catalog/highlights/').status_code, 200)
+            self.assertEqual(cache.stats()['by_year'], (2, 3, 0.4))
+            self.assertEqual(cache.stats()['for_catalog'], (0, 1, 0.0))
+
+            cache.clear_stats()
+            self.assertEqual(cache.stats()['by_year'], (0, 0, None))
+
+            # large exports are only streamed
+            with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'page_cache_max_size': 100}):
+                for _ in range(2):
+                    self.assertEqual(b''.join(self.client.get('/publications/?ris').streaming_content)[:6],
+                                     b'\nTY  -')
+            self.assertEqual(cache.stats()['by_year'], (0, 2, 0.0))
+
 class AdminTests(TestCase):
     fixtures = ['initial_data.json', 'test_data.json']
 
@@ -238,6 +630,13 @@ class AdminTests(TestCase):
         User.objects.create_superuser('admin', 'admin@test.de', 'admin')
         self.client.login(username='admin', password='admin')
 
+        # the imported files are stored as media
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
     def test_basics(self):
         self.assertEqual(self.client.get('/publications/').status_code, 200)
         self.assertEqual(self.client.get('/admin/publications_bootstrap/').status_code, 200)
@@ -299,6 +698,32 @@ class AdminTests(TestCase):
                 self.assertContains(response, '1 publication was successfully marked as ',
                                     msg_prefix="AssertionError in {}: ".format(action))
 
+    def test_possible_duplicates(self):
+        publication = Publication.objects.get(pk=1)
+        publication.save()
+        self.assertEqual(len(publication.fingerprint), 40)
+
+        # the fingerprint ignores the formatting of the title, the given names and the other fields
+        duplicate = Publication.objects.get(pk=1)
+        duplicate.pk = duplicate.citekey = None
+        duplicate.title = '{' + publication.title.upper() + '.}'
+        duplicate.authors = publication.authors.replace('A. S. Ecker', 'Alexander S. Ecker')
+        duplicate.journal = 'Other'
+        duplicate.save()
+        self.assertEqual(duplicate.fingerprint, publication.fingerprint)
+        other = Publication.objects.get(pk=2)
+        other.save()
+
+        res = self.client.get('/admin/publications_bootstrap/publication/?duplicates=yes')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted(p.pk for p in res.context_data['cl'].result_list), [1, duplicate.pk])
+
+        duplicate.doi = '10.1016/j.neuron.2014.06.007'
+        duplicate.save()
+        self.assertNotEqual(duplicate.fingerprint, publication.fingerprint)
+        res = self.client.get('/admin/publications_bootstrap/publication/?duplicates=yes')
+        self.assertEqual(list(res.context_data['cl'].result_list), [])
+
     def test_publication_change(self):
         res = self.client.get('/admin/publications_bootstrap/publication/1/change/')
         self.assertEqual(res.status_code, 200)
@@ -313,6 +738,7 @@ class AdminTests(TestCase):
         count = Publication.objects.count()
         self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
                          {'bibliography': TEST_BIBLIOGRAPHY}, follow=False)
+        call_command('process_import_jobs', once=True, verbosity=0)
 
         self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT)
 
@@ -329,6 +755,174 @@ class AdminTests(TestCase):
         self.assertEqual(len(publications), 1)
         self.assertTrue(publications[0].title.startswith('How Good is 85%?'))
 
+    def test_bibtex_import_file(self):
+        count = Publication.objects.count()
+        bibliography = TEST_BIBLIOGRAPHY.encode('utf-8')
+        self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
+                         {'bibliography_file': SimpleUploadedFile('test.bib.gz', gzip.compress(bibliography))})
+        call_command('process_import_jobs', once=True, verbosity=0)
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT)
+
+        # entries already imported, and the first entry of a plain file
+        first = bibliography[:bibliography.index(b'@article{Simovski2011')]
+        self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
+                         {'bibliography_file': SimpleUploadedFile('test.bib', bibliography + first)})
+        call_command('process_import_jobs', once=True, verbosity=0)
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT)
+        job = ImportJob.objects.first()
+        self.assertEqual((job.status, job.parsed, job.saved, job.skipped, job.error_count),
+                         (ImportJob.EStatuses.DONE, TEST_BIBLIOGRAPHY_COUNT + 1, 0, TEST_BIBLIOGRAPHY_COUNT + 1, 0))
+
+    def test_bibtex_import_job(self):
+        response = self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
+                                    {'bibliography': TEST_BIBLIOGRAPHY})
+        job = ImportJob.objects.get()
+        self.assertEqual(job.user.username, 'admin')
+        self.assertRedirects(response, '/admin/publications_bootstrap/publication/import_bibtex/{}/'.format(job.pk))
+
+        # nothing is imported until the job is claimed, by a single worker
+        url = '/admin/publications_bootstrap/publication/import_bibtex/{}/?format=json'.format(job.pk)
+        self.assertEqual(self.client.get(url).json(), {'status': 'q', 'status_label': 'queued', 'parsed': 0,
+                                                       'saved': 0, 'updated': 0, 'skipped': 0, 'errors': 0,
+                                                       'finished': False})
+        claimed = ImportJob.objects.claim()
+        self.assertEqual((claimed.pk, claimed.status), (job.pk, ImportJob.EStatuses.RUNNING))
+        self.assertIsNone(ImportJob.objects.claim())
+
+        call_command('process_import_jobs', once=True, verbosity=0)
+        self.assertEqual(self.client.get(url).json()['status'], 'r')
+        process_import_job(claimed)
+        progress = self.client.get(url).json()
+        self.assertEqual((progress['status'], progress['saved'], progress['finished']),
+                         ('d', TEST_BIBLIOGRAPHY_COUNT, True))
+        self.assertEqual(self.client.get(url[:-len('?format=json')]).status_code, 200)
+
+        # a job abandoned by its worker is claimed again, from the start
+        from datetime import timedelta
+        from django.utils import timezone
+        ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.EStatuses.RUNNING,
+                                                   heartbeat=timezone.now() - timedelta(seconds=60))
+        self.assertIsNone(ImportJob.objects.claim())
+        claimed = ImportJob.objects.claim(timeout=30)
+        self.assertEqual((claimed.pk, claimed.parsed, claimed.saved), (job.pk, 0, 0))
+        self.assertIsNone(ImportJob.objects.claim(timeout=30))
+        process_import_job(claimed)
+        job = ImportJob.objects.get(pk=job.pk)
+        self.assertEqual((job.status, job.saved, job.skipped), (ImportJob.EStatuses.DONE, 0, TEST_BIBLIOGRAPHY_COUNT))
+
+        # an empty bibliography is not queued
+        response = self.client.post('/admin/publications_bootstrap/publication/import_bibtex/', {'bibliography': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+    def test_bibtex_import_batches(self):
+        count = Publication.objects.count()
+        publications, errors = import_bibtex(TEST_BIBLIOGRAPHY, batch_size=4)
+        self.assertEqual((len(publications), errors), (TEST_BIBLIOGRAPHY_COUNT, []))
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT)
+        publication = Publication.objects.get(citekey='test:2009')
+        self.assertEqual(publication.citekey_lower, 'test:2009')
+        self.assertIn('C. F. Gauss II', publication.author_set.values_list('name', flat=True))
+
+        # unchanged entries are found with one query per batch
+        with self.assertNumQueries(3):
+            duplicates, errors = import_bibtex(TEST_BIBLIOGRAPHY, batch_size=6)
+        self.assertEqual([p.pk for p in duplicates], [p.pk for p in publications])
+
+        # changed entries update their publication in place, conflicts are reported
+        Publication.objects.filter(citekey='Bethge2002c').update(status=Publication.EStatuses.DRAFT)
+        changed = """
+@article{bethge2002C,
+  author = "M. Bethge",
+  title = "Other",
+  year = {2003}
+}
+
+@article{New2003,
+  author = "M. Bethge",
+  title = "New",
+  year = {2003},
+  doi = {10.1523/JNEUROSCI.2539-11.2011}
+}
+
+@article{New2004,
+  author = "M. Bethge",
+  title = "Newer",
+  year = {2004}
+}
+"""
+        batch, = import_bibtex_batches(changed)
+        self.assertEqual([p.citekey for p in batch.publications], ['Bethge2002c', 'New2004'])
+        self.assertEqual((batch.created, batch.updated), (1, 1))
+        self.assertEqual(len(batch.errors), 1)
+        self.assertIn('New2003', batch.errors[0])
+        publication = Publication.objects.get(citekey='Bethge2002c')
+        self.assertEqual((publication.title, publication.year, publication.journal, publication.status),
+                         ('Other', 2003, '', Publication.EStatuses.DRAFT))
+        self.assertEqual(publication.fingerprint, publication._produce_fingerprint())
+        self.assertEqual(list(publication.author_set.values_list('name', flat=True)), ['M. Bethge'])
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT + 1)
+
+        updated = unchanged = 0
+        for batch in import_bibtex_batches(TEST_BIBLIOGRAPHY, batch_size=4):
+            updated += batch.updated
+            unchanged += len(batch.publications) - batch.created - batch.updated
+        self.assertEqual((updated, unchanged), (1, TEST_BIBLIOGRAPHY_COUNT - 1))
+        self.assertEqual(Publication.objects.get(citekey='Bethge2002c').journal, 'Neural Computation')
+
+        # publications which were not imported are not replaced by entries with the same citekey
+        batch, = import_bibtex_batches('@article{ecker2014A,\n  author = "A. Ecker",\n  title = "Replaced",\n'
+                                       '  year = {2014}\n}\n')
+        self.assertEqual((batch.publications, batch.created, batch.updated), ([], 0, 0))
+        self.assertEqual(len(batch.errors), 1)
+        self.assertIn('ecker2014A', batch.errors[0])
+        self.assertEqual(Publication.objects.get(citekey='Ecker2014a').title,
+                         'State dependence of noise correlations in macaque primary visual cortex')
+
+        # publications which cannot be updated are only reported as errors
+        batch, = import_bibtex_batches('@article{Bethge2002c,\n  author = "M. Bethge",\n  title = "Other",\n'
+                                       '  year = {2003},\n  doi = {10.1523/JNEUROSCI.2539-11.2011}\n}\n')
+        self.assertEqual((batch.publications, batch.created, batch.updated, len(batch.errors)), ([], 0, 0, 1))
+        self.assertIn('Bethge2002c', batch.errors[0])
+        self.assertEqual(Publication.objects.get(citekey='Bethge2002c').doi, '10.1162/08997660260293247')
+
+        # unchanged entries can be left out before parsing, with one query per batch
+        with self.assertNumQueries(2):
+            batches = list(import_bibtex_batches(TEST_BIBLIOGRAPHY, batch_size=6, skip_unchanged=True))
+        self.assertEqual([(len(batch.publications), batch.skipped) for batch in batches], [(0, 6), (0, 5)])
+
+    def test_bibtex_import_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'test.bib.gz')
+        with gzip.open(path, 'wb') as f:
+            f.write(TEST_BIBLIOGRAPHY.encode('utf-8'))
+        checkpoint = os.path.join(directory, 'checkpoint.json')
+        count = Publication.objects.count()
+
+        # an interrupted import resumes after the entries recorded in the checkpoint
+        with open(checkpoint, 'w') as f:
+            stat = os.stat(path)
+            json.dump({path: dict(size=stat.st_size, mtime=stat.st_mtime, records=4)}, f)
+        out = StringIO()
+        call_command('import_bibtex', os.path.join(directory, '*.bib*'), jobs=2, batch_size=3,
+                     checkpoint=checkpoint, stdout=out)
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT - 4)
+        self.assertFalse(Publication.objects.filter(citekey='Bethge2002c').exists())
+        self.assertIn('1 file(s), {} entries: {} added, 0 updated, 0 unchanged, 0 error(s).'.format(
+            TEST_BIBLIOGRAPHY_COUNT - 4, TEST_BIBLIOGRAPHY_COUNT - 4), out.getvalue())
+        self.assertIn('entries/s', out.getvalue())
+        self.assertFalse(os.path.exists(checkpoint))
+
+        # the whole directory
+        out = StringIO()
+        call_command('import_bibtex', directory, jobs=1, checkpoint=checkpoint, stdout=out)
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT)
+        self.assertIn('1 file(s), {} entries: 4 added, 0 updated, {} unchanged'.format(
+            TEST_BIBLIOGRAPHY_COUNT, TEST_BIBLIOGRAPHY_COUNT - 4), out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_bibtex', os.path.join(directory, '*.ris'), checkpoint=checkpoint)
+
 
 class TestExtras(TestCase):
     fixtures = ['initial_data.json', 'test_data.json']
@@ -338,6 +932,8 @@ class TestExtras(TestCase):
         # tex_parse is used to replace simple LaTeX code in publication titles
         self.assertEqual(tex_parse(u'$L_p$-spherical'), u'L<sub>p</sub>-spherical')
         self.assertEqual(tex_parse(u'$L^2$-spherical'), u'L<sup>2</sup>-spherical')
+        self.assertEqual(tex_parse(u'$\\alpha_{12}^_x$ & <b>$\\Omega$</b>'),
+                         u'&alpha;<sub>1</sub>2^<sub>x</sub> &amp; &lt;b&gt;&Omega;&lt;/b&gt;')
 
     def test_flatten_authors(self):
         # Default values
@@ -392,6 +988,13 @@ class TestExtras(TestCase):
 <a href="/publications/l.+theis/">L. Theis</a> and
 <a href="/publications/b.+sengupta/">B. Sengupta</a> and
 <a href="/publications/m.+st%C3%BCttgen/">M. Stüttgen</a>&nbsp;<b>et al.</b>""")
+        # Explicit template, rendered as is
+        tpl = Template("""{% load publication_extras %}{{ publication.authors_escaped|flatten_authors:args }}""")
+        for args in ('limit=6&last=, and', 'limit=2&separator=;'):
+            ctx = dict(publication=Publication.objects.get(pk=2), args=args)
+            res = tpl.render(RequestContext(HttpRequest(), ctx))
+            ctx['args'] += '&template=publications_bootstrap/filters/authors.html'
+            self.assertEqual(tpl.render(RequestContext(HttpRequest(), ctx)), res)
 
     def test__get_publication(self):
         from publications_bootstrap.templatetags import publication_extras
@@ -417,6 +1020,19 @@ class TestExtras(TestCase):
         tpl.render(RequestContext(HttpRequest()))
         # TODO: some assertions
 
+    def test_get_tag_cloud(self):
+        for title in (u'Title 1', u'Title 2'):
+            Publication.objects.create(type=Type.objects.get(pk=1), authors=u'A. Unique', title=title, year=2014,
+                                       journal=u'Journal', tags=u'common, ' + title.lower(), external=0)
+        tpl = Template("""{% load publication_extras %}{% get_tag_cloud %}""")
+        res = tpl.render(RequestContext(HttpRequest()))
+        self.assertInHTML(
+            """<a class="tag" href="/publications/tag/common/" title="2"><span class="tag tag-default tag-weight-5">common</span></a>""",
+            res)
+        self.assertInHTML(
+            """<a class="tag" href="/publications/tag/title+1/" title="1"><span class="tag tag-default tag-weight-1">title 1</span></a>""",
+            res)
+
     def test__get_catalog(self):
         from publications_bootstrap.templatetags import publication_extras
         self.assertEqual(publication_extras._get_catalog(1), publication_extras._get_catalog('highlights'))
@@ -472,19 +1088,21 @@ Functional analysis of ultra high information rates conveyed by rat vibrissal pr
         # TODO: test other publication types
 
     def test_cite(self):
+        # the citations persist through the templates rendered for the same request
+        request = HttpRequest()
         tpl = Template("""{% load publication_extras %}{% cite 2 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())), """[<a href="#Chagas2013a">1</a>]""")
+        self.assertEqual(tpl.render(RequestContext(request)), """[<a href="#Chagas2013a">1</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 1 2 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())),
+        self.assertEqual(tpl.render(RequestContext(request)),
                          """[<a href="#Chagas2013a">1</a>,<a href="#Ecker2014a">2</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 1 5 2 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())),
+        self.assertEqual(tpl.render(RequestContext(request)),
                          """[<a href="#Chagas2013a">1</a>&#8209;<a href="#Gerhard2014a">3</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 2 5 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())),
+        self.assertEqual(tpl.render(RequestContext(request)),
                          """[<a href="#Chagas2013a">1</a>,<a href="#Gerhard2014a">3</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 'ThisIsNoCitekey' %}""")
-        self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(HttpRequest()))
+        self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(request))
         # TODO: test other params: sup, open/close, href
 
     def test_nocite(self):
@@ -495,8 +1113,16 @@ Functional analysis of ultra high information rates conveyed by rat vibrissal pr
         tpl = Template("""{% load publication_extras %}{% nocite 'ThisIsNoCitekey' %}""")
         self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(HttpRequest()))
 
+    def test_prefetch_citations(self):
+        tpl = Template("""{% load publication_extras %}{% prefetch_citations 3 %}
+{% cite 2 'ecker2014A' %}{% for puid in puids %}{% nocite puid %}{% endfor %}{% cite 1 'Chagas2013a' 3 %}""")
+        with self.assertNumQueries(1):
+            res = tpl.render(RequestContext(HttpRequest(), {'puids': [1]}))
+        self.assertIn("""[<a href="#Chagas2013a">1</a>,<a href="#Ecker2014a">2</a>]""", res)
+        self.assertIn("""[<a href="#Chagas2013a">1</a>&#8209;<a href="#Theis2011a">3</a>]""", res)
+
     def test_thebibliography(self):
-        tpl = Template("""{% load publication_extras %}{% thebibliography %}""")
+        tpl = Template("""{% load publication_extras %}{% nocite 2 1 5 3 %}{% thebibliography %}""")
         res = tpl.render(RequestContext(HttpRequest()))
         self.assertIn("""<div class="card mt-5 bibliography">""", res)
         self.assertInHTML("""<h4 class="card-title">References</h4>""", res)
@@ -536,6 +1162,31 @@ Functional analysis of ultra high information rates conveyed by rat vibrissal pr
         tpl = Template("""{% load publication_extras %}{% nocite 2 %}{% thebibliography sorting='foobar' %}""")
         self.assertRaises(NotImplementedError, tpl.render, RequestContext(HttpRequest()))
 
+    def test_citations_threads(self):
+        import re
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from django.db import connections
+
+        tpl = Template("""{% load publication_extras %}{% cite first %}{{ wait }}{% cite second %}
+{% thebibliography %}""")
+        pairs = [(1, 2), (3, 5), (2, 3), (5, 1)] * 4
+        # all the pages are being rendered at the same time, between the citations
+        barrier = threading.Barrier(len(pairs))
+        connection = connections['default']
+        connection.allow_thread_sharing = True
+
+        def render(pair):
+            connections['default'] = connection
+            return tpl.render(RequestContext(HttpRequest(), {'first': pair[0], 'second': pair[1], 'wait': barrier.wait}))
+
+        with ThreadPoolExecutor(len(pairs)) as executor:
+            pages = list(executor.map(render, pairs))
+        citekeys = dict(Publication.objects.values_list('pk', 'citekey'))
+        for pair, page in zip(pairs, pages):
+            self.assertEqual(re.findall(r'<li class="list-group-item" id="([^"]+)">', page),
+                             [citekeys[pk] for pk in pair])
+
     def test_settings(self):
         # TODO: default values set in django.conf.settings
         pass
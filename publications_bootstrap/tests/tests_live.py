@@ -3,6 +3,7 @@
 from time import sleep
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import LiveServerTestCase
 from selenium import webdriver
 
@@ -47,6 +48,7 @@ class LiveTests(LiveServerTestCase):
         bibliography_input = self.selenium.find_element_by_name("bibliography")
         bibliography_input.send_keys(tests.TEST_BIBLIOGRAPHY)
         self.selenium.find_element_by_xpath('//input[@value="Import"]').click()
+        call_command('process_import_jobs', once=True, verbosity=0)
 
         self.assertEqual(Publication.objects.count() - count, tests.TEST_BIBLIOGRAPHY_COUNT)
 
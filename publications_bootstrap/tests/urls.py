@@ -8,6 +8,6 @@ from django.contrib import admin
 admin.autodiscover()
 
 urlpatterns = [
-    url(r'^publications/', include('publications_bootstrap.urls', 'publications_test')),
+    url(r'^publications/', include('publications_bootstrap.urls', 'publications_bootstrap')),
     url(r'^admin/', admin.site.urls),
 ]
@@ -2,5 +2,7 @@ __license__ = 'MIT License <http://www.opensource.org/licenses/mit-license.php>'
 __author__ = 'Lucas Theis <lucas@theis.io>'
 __docformat__ = 'epytext'
 
-from .import_bibtex import import_bibtex
+from .conditional import publications_condition
+from .export import export
+from .import_bibtex import import_bibtex, import_bibtex_batches, process_import_job
 from .populate import populate
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .. import __version__
+from ..models import Catalog, Type
+
+
+def _latest(model):
+    # the latest modification time of the rows of a model
+    return model.objects.aggregate(modified=Max('modified'))['modified']
+
+
+def publications_condition(get_publications):
+    """
+    Decorator answering conditional GET requests of a view with 304 Not Modified, before the view is called.
+
+    The ETag depends on the latest modification time and the number of the publications listed by the view, computed
+    with a single aggregate query, and on the latest modification time of the types and catalogs, which are shown along
+    with the publications. It also depends on the query string, i.e. the export format or the page.
+
+    There is no Last-Modified validator, as deleting a publication does not move the latest modification time.
+
+    Parameters
+    ----------
+    get_publications : callable
+        Called with the arguments of the view, returns the queryset of the publications listed by the view.
+    """
+
+    def validator(request, *args, **kwargs):
+        # computed once per request, for the ETag header
+        if not hasattr(request, '_publications_validator'):
+            request._publications_validator = get_publications(request, *args, **kwargs).aggregate(
+                modified=Max('modified'), count=Count('pk', distinct=True))
+            request._publications_validator.update(types=_latest(Type), catalogs=_latest(Catalog))
+        return request._publications_validator
+
+    def etag(request, *args, **kwargs):
+        publications = validator(request, *args, **kwargs)
+        if not publications['count']:
+            return None
+        query = md5(request.META.get('QUERY_STRING', '').encode('utf-8')).hexdigest()
+        modified = [publications[key].strftime('%Y%m%d%H%M%S%f') if publications[key] else ''
+                    for key in ('modified', 'types', 'catalogs')]
+        return '{}-{}-{}-{}'.format(__version__, publications['count'], '-'.join(modified), query)
+
+    return condition(etag_func=etag)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import os
+from collections import namedtuple
+from functools import partial
+from itertools import islice
+
+from django.db.models.query import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import Context, Engine
+from django.template.loader import get_template
+
+from ..models import Publication
+from ..models.type import type_registry
+from ..serializers import SERIALIZERS
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+# number of publications fetched and serialized at once
+CHUNK_SIZE = 100
+
+ExportFormat = namedtuple('ExportFormat', ['template', 'list_template', 'header', 'padding', 'footer', 'autoescape',
+                                           'content_type'])
+
+EXPORT_FORMATS = {
+    'plain': ExportFormat('publications_bootstrap/export/publication.txt',
+                          'publications_bootstrap/export/publications.txt', '', '', '\n', False,
+                          'text/plain; charset=UTF-8'),
+    'bibtex': ExportFormat('publications_bootstrap/export/publication.bib',
+                           'publications_bootstrap/export/publications.bib', '', '\n', '\n', False,
+                           'text/x-bibtex; charset=UTF-8'),
+    'mods': ExportFormat('publications_bootstrap/export/publication.mods',
+                         'publications_bootstrap/export/publications.mods',
+                         '<?xml version="1.0" encoding="UTF-8"?>\n'
+                         '<modsCollection xmlns="http://www.loc.gov/mods/v3">\n\t', '', '\n</modsCollection>\n', True,
+                         'application/xml; charset=UTF-8'),
+    'ris': ExportFormat('publications_bootstrap/export/publication.ris',
+                        'publications_bootstrap/export/publications.ris', '', '', '\n', True,
+                        'application/x-research-info-systems; charset=UTF-8'),
+}
+
+
+def _chunks(publications, size=CHUNK_SIZE):
+    if isinstance(publications, QuerySet):
+        publications = publications.iterator()
+    publications = iter(publications)
+    # the types are shared by the publications, rather than joined and instantiated for each of them
+    types = type_registry().types
+    while True:
+        chunk = list(islice(publications, size))
+        if not chunk:
+            return
+        for publication in chunk:
+            if publication.type_id in types:
+                publication.type = types[publication.type_id]
+        yield chunk
+
+
+def _is_overridden(template):
+    """
+    Whether the template is not the one shipped with the app, but an override in the project.
+    """
+    return not os.path.abspath(template.origin.name).startswith(TEMPLATES_DIR)
+
+
+def _serialize(request, publications, fmt):
+    export_format = EXPORT_FORMATS[fmt]
+    engine = Engine.get_default()
+    template = engine.get_template(export_format.template)
+
+    # run the context processors once, not for every publication
+    processors = {'request': request}
+    for processor in engine.template_context_processors:
+        processors.update(processor(request))
+
+    if _is_overridden(template):
+        context = Context(processors, autoescape=export_format.autoescape)
+
+        def serialize(publication):
+            with context.push(publication=publication):
+                return template.render(context)
+    elif fmt == 'mods':
+        serialize = partial(SERIALIZERS[fmt], media_url=processors.get('MEDIA_URL', ''))
+    else:
+        serialize = SERIALIZERS[fmt]
+
+    yield export_format.header
+    for chunk in _chunks(publications):
+        if fmt == 'bibtex':
+            Publication.generate_keys(chunk)
+        for publication in chunk:
+            yield export_format.padding + serialize(publication) + export_format.padding
+    yield export_format.footer
+
+
+def export(request, publications, fmt):
+    """
+    Stream the publications in the given format, one entry at a time.
+
+    The entries are written by the serializers of `publications_bootstrap.serializers`, unless the entry template of
+    the format is overridden in the project, e.g. `publications_bootstrap/export/publication.bib`. If the list template
+    of the format is overridden, e.g. `publications_bootstrap/export/publications.bib`, the whole export is rendered by
+    it instead, without streaming.
+
+    Parameters
+    ----------
+    request : HttpRequest
+    publications : QuerySet or iterable of Publication
+        Querysets are fetched in chunks, such that the memory usage does not depend on the number of publications.
+    fmt : str
+        One of 'plain', 'bibtex', 'mods' and 'ris'.
+
+    Returns
+    -------
+    StreamingHttpResponse or HttpResponse
+    """
+    export_format = EXPORT_FORMATS[fmt]
+    list_template = get_template(export_format.list_template)
+    if _is_overridden(list_template):
+        listed = []
+        for chunk in _chunks(publications):
+            if fmt == 'bibtex':
+                Publication.generate_keys(chunk)
+            listed.extend(chunk)
+        return HttpResponse(list_template.render({'publications': listed}, request),
+                            content_type=export_format.content_type)
+
+    return StreamingHttpResponse(_serialize(request, publications, fmt),
+                                 content_type=export_format.content_type)
@@ -4,15 +4,41 @@ __license__ = 'MIT License <http://www.opensource.org/licenses/mit-license.php>'
 __author__ = 'Lucas Theis <lucas@theis.io> and Christian Glodt <chris@mind.lu>'
 __docformat__ = 'epytext'
 
-from publications_bootstrap.models import Publication, Type
+from publications_bootstrap import cache
+from publications_bootstrap.apps import PublicationsBootstrapConfig
+from publications_bootstrap.models import ImportJob, Publication, PublicationAuthor, Tag
+from publications_bootstrap.models.author import _batches
+from publications_bootstrap.models.type import type_registry
 from bibtexparser.bparser import BibTexParser
 from bibtexparser.customization import author, keyword
-from django.forms.models import model_to_dict
 from django.core.exceptions import FieldDoesNotExist
 from django_countries import countries
-from django.db import IntegrityError, transaction
+from django.db import connections, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
 
+import gzip
+import hashlib
+import io
 import re
+import traceback
+from collections import OrderedDict, namedtuple
+
+# default number of publications saved at once
+BATCH_SIZE = 500
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# saved or existing publications of a batch of entries, error messages, number of publications added and updated,
+# and number of entries left out as the publications were imported from the same entries
+ImportBatch = namedtuple('ImportBatch', ['publications', 'errors', 'created', 'updated', 'skipped'])
+
+# key of a BibTeX record
+RECORD_KEY = re.compile(r'@\s*\w+\s*[{(]\s*([^,\s]+)\s*,')
+
+# fields of the publications which are not described by the BibTeX entries, kept when a publication is updated
+LOCAL_FIELDS = ('id', 'citekey', 'citekey_lower', 'pdf', 'image', 'thumbnail', 'external', 'status', 'summary',
+                'created')
 
 # mapping of months
 MONTHS = {
@@ -62,47 +88,430 @@ def _bibtexparser_customizations(record):
     record = _fix_text_grouping(record)
     return record
 
-def import_bibtex(bibtex, bibtexparser_customization=None):
+def _update_publications(publications, errors):
     '''
-    Import BibTeX data from a file-like object or a string
+    Update publications, with one query per batch of publications.
+
+    @rtype: list
+    @return: the publications updated
+    '''
+    fields = [field for field in Publication._meta.concrete_fields if field.name not in LOCAL_FIELDS]
+    # each publication adds two parameters per field, to the CASE of the field
+    size = max(connections[Publication.objects.db].ops.bulk_batch_size(['pk', 'pk'] + fields, publications), 1)
+    try:
+        with transaction.atomic():
+            for i in range(0, len(publications), size):
+                batch = publications[i:i + size]
+                Publication.objects.filter(pk__in=[publication.pk for publication in batch]).update(**dict(
+                    (field.attname, Case(*[When(pk=publication.pk, then=Value(getattr(publication, field.attname),
+                                                                               output_field=field))
+                                           for publication in batch], output_field=field))
+                    for field in fields))
+        return publications
+    except Exception:
+        # some publications cannot be updated, update them one by one to report which
+        updated = []
+        for publication in publications:
+            try:
+                with transaction.atomic():
+                    Publication.objects.filter(pk=publication.pk).update(**dict(
+                        (field.attname, getattr(publication, field.attname)) for field in fields))
+                updated.append(publication)
+            except Exception as e:
+                errors.append('An error occurred updating '
+                              'publication "%s": %s' % (publication.citekey, e))
+        return updated
+
+
+def _save_publications(publications, errors, skipped=0):
     '''
+    Save new publications, unless possible duplicates of existing ones, and update the publications imported from
+    entries which changed since, with a few queries for the whole batch.
 
-    # BibTexParser expects a utf-8 byte-string or unicode
-    #if isinstance(bibtex, str):
-        #bibtex = bibtex.encode('utf-8')
+    @type  publications: list
+    @param publications: unsaved publications, normalized, with the hash of their entry
 
+    @type  errors: list
+    @param errors: error messages of the batch, extended with the publications which could not be saved
+
+    @type  skipped: int
+    @param skipped: number of entries of the batch left out as unchanged
+
+    @rtype: L{ImportBatch}
+    @return: the saved or existing publications, in the same order, and the number of publications added and updated
+    '''
+    if not publications:
+        return ImportBatch([], errors, 0, 0, skipped)
+
+    for publication in publications:
+        publication.fingerprint = publication._produce_fingerprint()
+        publication.citekey_lower = publication.citekey.lower() if publication.citekey else None
+
+    # publications imported with the same citekey are updated, unless their entry is unchanged, the other publications
+    # with the same citekey are conflicts reported when saving
+    imported = {}
+    for batch in _batches(set(publication.citekey_lower for publication in publications
+                              if publication.citekey_lower)):
+        for publication in Publication.objects.filter(citekey_lower__in=batch).exclude(source_hash=''):
+            imported[publication.citekey_lower] = publication
+
+    existing = {}
+    for batch in _batches(set(publication.fingerprint for publication in publications
+                              if publication.citekey_lower not in imported)):
+        for publication in Publication.objects.filter(fingerprint__in=batch):
+            existing.setdefault(publication.fingerprint, publication)
+
+    result = []
+    new = []
+    changed = OrderedDict()
+    now = timezone.now()
+    for publication in publications:
+        previous = imported.get(publication.citekey_lower)
+        if previous is not None:
+            if not publication.source_hash or previous.source_hash != publication.source_hash:
+                for field in Publication._meta.concrete_fields:
+                    if field.name not in LOCAL_FIELDS:
+                        setattr(previous, field.attname, getattr(publication, field.attname))
+                previous.coins = previous._produce_coins()
+                previous.modified = now
+                changed[previous.pk] = previous
+            result.append(previous)
+            continue
+
+        if publication.fingerprint not in existing:
+            # later entries with the same fingerprint are considered as duplicates of this publication
+            existing[publication.fingerprint] = publication
+            publication.coins = publication._produce_coins()
+            new.append(publication)
+        result.append(existing[publication.fingerprint])
+
+    # the ids of the publications created in bulk are looked up by citekey
+    created = [publication for publication in new if publication.citekey]
+    if created:
+        try:
+            with transaction.atomic():
+                Publication.objects.bulk_create(created)
+                missing = dict((publication.citekey_lower, publication) for publication in created
+                               if publication.pk is None)
+                for batch in _batches(missing):
+                    for citekey_lower, pk in Publication.objects.filter(citekey_lower__in=batch) \
+                            .values_list('citekey_lower', 'pk'):
+                        missing[citekey_lower].pk = pk
+                PublicationAuthor.objects.index(created)
+                Tag.objects.index(created)
+        except Exception:
+            # some publications cannot be saved, save them one by one to report which
+            for publication in created:
+                publication.pk = None
+
+    for publication in new:
+        if publication.pk is not None:
+            continue
+        try:
+            with transaction.atomic():
+                publication.save()
+        except Exception as e:
+            # show error message
+            key = publication.citekey
+            if not key:
+                key = '<unnamed>'
+            errors.append('An error occurred saving '
+                          'publication "%s": %s' % (key, e))
+
+    updated = []
+    if changed:
+        updated = _update_publications(list(changed.values()), errors)
+        PublicationAuthor.objects.index(updated)
+        Tag.objects.index(updated)
+        # the publications which could not be updated are reported as errors only
+        failed = set(changed) - set(publication.pk for publication in updated)
+        result = [publication for publication in result if publication.pk not in failed]
+
+    if new or changed:
+        # the signals are not sent for the publications created or updated in bulk
+        cache.invalidate()
+
+    return ImportBatch([publication for publication in result if publication.pk is not None], errors,
+                       sum(1 for publication in new if publication.pk is not None), len(updated), skipped)
+
+
+def open_bibtex(file):
+    '''
+    Lines of a BibTeX file, decompressed on the fly if compressed with gzip.
+
+    @type  file: file
+    @param file: binary file, supporting C{seek}
+
+    @rtype: file
+    @return: the file, or the decompressed file
+    '''
+    file.seek(0)
+    compressed = file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    file.seek(0)
+    if compressed:
+        return gzip.GzipFile(fileobj=file, mode='rb')
+    return file
+
+
+def process_import_job(job, batch_size=None):
+    '''
+    Import the file of a claimed job, see C{ImportJob.objects.claim}. Each batch is committed and the progress of the
+    job is saved after each batch, along with a heartbeat telling the job is still running.
+
+    @type  job: L{ImportJob}
+    @param job: running job
+    '''
+    fields = ['parsed', 'saved', 'updated', 'skipped', 'error_count', 'errors', 'heartbeat']
+    try:
+        job.file.open('rb')
+        try:
+            for batch in import_bibtex_batches(open_bibtex(job.file), batch_size=batch_size, skip_unchanged=True):
+                job.parsed += len(batch.publications) + len(batch.errors) + batch.skipped
+                job.saved += batch.created
+                job.updated += batch.updated
+                job.skipped += len(batch.publications) - batch.created - batch.updated + batch.skipped
+                job.error_count += len(batch.errors)
+                job.errors += ''.join(error.replace('\n', ' ') + '\n' for error in batch.errors)
+                # the job is claimed again by another worker if the progress is not saved for a while
+                job.heartbeat = timezone.now()
+                job.save(update_fields=fields)
+        finally:
+            job.file.close()
+        job.status = ImportJob.EStatuses.DONE
+    except Exception:
+        job.status = ImportJob.EStatuses.FAILED
+        job.error_count += 1
+        job.errors += traceback.format_exc()
+    job.finished = timezone.now()
+    job.save(update_fields=fields + ['status', 'finished'])
+
+
+def _lines(bibtex):
     if isinstance(bibtex, bytes):
         bibtex = bibtex.decode('utf-8')
+    if isinstance(bibtex, str):
+        bibtex = io.StringIO(bibtex)
+
+    for i, line in enumerate(bibtex):
+        # make sure we are dealing with unicode strings, no multibyte character spans several lines
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not i:
+            # some files have a byte order mark
+            line = line.lstrip('\ufeff')
+        yield line
+
+
+def _records(lines):
+    # the lines of each record start with a line starting with @, as bundled by bibtexparser
+    record = []
+    for line in lines:
+        if line.lstrip().startswith('@'):
+            if record:
+                yield ''.join(record)
+            record = [line.lstrip()]
+        elif record:
+            record.append(line)
+    if record:
+        yield ''.join(record)
+
+
+def _chunks(bibtex, chunk_size, skip=0):
+    '''
+    Split BibTeX data on entry boundaries, into chunks of records which can be parsed independently.
 
-    # add trailing newline if not present, otherwise bibtexparser will not parse fully
-    if not bibtex.endswith('\n'):
-        bibtex = bibtex + '\n'
+    @type  bibtex: string or file
+    @param bibtex: BibTeX data, or lines of BibTeX data, as text or as UTF-8 encoded bytes
+
+    @type  skip: int
+    @param skip: number of records to leave out, e.g. those already imported
+
+    @rtype: generator
+    @return: the string definitions preceding each chunk, and the records of the chunk
+    '''
+    # the string definitions apply to the following records, hence to the next chunks
+    strings = []
+    chunk = []
+    for record in _records(_lines(bibtex)):
+        if record.lower().startswith('@string'):
+            if chunk:
+                yield tuple(strings), chunk
+                chunk = []
+            strings.append(record)
+        elif skip:
+            skip -= 1
+        else:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield tuple(strings), chunk
+                chunk = []
+    if chunk:
+        yield tuple(strings), chunk
+
+
+def _prepare_chunk(strings, records, skip_unchanged=False):
+    '''
+    Hash the records of a chunk, which only change if the records or the string definitions change, and optionally
+    leave out the records the publications were imported from, with one query.
+
+    @rtype: tuple
+    @return: the data to parse, the hash of the records by lowercase key, and the number of records left out
+    '''
+    prefix = hashlib.sha1(''.join(strings).encode('utf-8')).hexdigest()
+    hashes = OrderedDict()
+    for record in records:
+        match = RECORD_KEY.match(record)
+        if match:
+            hashes[match.group(1).lower()] = hashlib.sha1((prefix + record.strip()).encode('utf-8')).hexdigest()
+
+    skipped = 0
+    if skip_unchanged and hashes:
+        unchanged = set()
+        for batch in _batches(list(hashes)):
+            unchanged.update(citekey_lower for citekey_lower, source_hash in Publication.objects.filter(
+                citekey_lower__in=batch).values_list('citekey_lower', 'source_hash')
+                             if source_hash == hashes[citekey_lower])
+        if unchanged:
+            kept = []
+            for record in records:
+                match = RECORD_KEY.match(record)
+                if match and match.group(1).lower() in unchanged:
+                    skipped += 1
+                else:
+                    kept.append(record)
+            records = kept
+
+    return ''.join(strings) + ''.join(records) if records else '', hashes, skipped
+
+
+def _parse_chunk(data, customization=None):
+    '''
+    Parse a chunk of BibTeX data with bibtexparser. Chunks can be parsed in other processes, as long as the
+    customization can be pickled.
+
+    @rtype: list
+    @return: the entries parsed by bibtexparser
+    '''
+    if not data:
+        return []
 
-    # try to parse BibTex
     def _cust(record):
         record = _bibtexparser_customizations(record)
-        if bibtexparser_customization:
-            record = bibtexparser_customization(record)
+        if customization:
+            record = customization(record)
         return record
-    bib = BibTexParser(bibtex,
-                       customization=_cust,
-                       ignore_nonstandard_types=False).get_entry_list()
 
+    # add trailing newline if not present, otherwise bibtexparser will not parse fully
+    if not data.endswith('\n'):
+        data += '\n'
+    return BibTexParser(data, customization=_cust, ignore_nonstandard_types=False).get_entry_list()
+
+
+def _entries(bibtex, customization, chunk_size, skip_unchanged=False):
+    '''
+    Parse BibTeX data incrementally, by chunks of records.
+
+    @rtype: generator
+    @return: the entries parsed by bibtexparser, the hash of the records by key and the number of records left out,
+        for each chunk
+    '''
+    for strings, records in _chunks(bibtex, chunk_size):
+        data, hashes, skipped = _prepare_chunk(strings, records, skip_unchanged)
+        yield _parse_chunk(data, customization), hashes, skipped
+
+
+def _hashed_entries(chunks):
+    # the number of records left out is given with the first entry of the chunk, or alone
+    for entries, hashes, skipped in chunks:
+        if not entries:
+            if skipped:
+                yield None, None, skipped
+            continue
+        for entry in entries:
+            yield entry, hashes.get(entry.get('ID', '').lower(), ''), skipped
+            skipped = 0
+
+
+def import_bibtex(bibtex, bibtexparser_customization=None, batch_size=None):
+    '''
+    Import BibTeX data from a file-like object or a string. The publications are saved in batches, with a few
+    queries per batch.
+
+    @type  batch_size: int
+    @param batch_size: number of publications per batch, see the setting C{PUBLICATIONS_BOOTSTRAP_IMPORT_BATCH_SIZE}
+
+    @rtype: tuple
+    @return: the saved or existing publications, and the error messages
+    '''
+    saved_publications = []
+    errors = []
+    for batch in import_bibtex_batches(bibtex, bibtexparser_customization, batch_size):
+        saved_publications.extend(batch.publications)
+        errors.extend(batch.errors)
+    return saved_publications, errors
+
+
+def import_bibtex_batches(bibtex, bibtexparser_customization=None, batch_size=None, skip_unchanged=False):
+    '''
+    Import BibTeX data like L{import_bibtex}, reading a file incrementally such that the memory used does not depend
+    on its size.
+
+    @type  bibtex: string or file
+    @param bibtex: BibTeX data, or lines of BibTeX data, as text or as UTF-8 encoded bytes
+
+    @type  skip_unchanged: bool
+    @param skip_unchanged: leave out the entries the publications were imported from before parsing them, they are
+        only counted in the batches
+
+    @rtype: generator
+    @return: the L{ImportBatch} of each batch
+    '''
+    if batch_size is None:
+        batch_size = PublicationsBootstrapConfig.defaults.get('import_batch_size', BATCH_SIZE)
+
+    # try to parse BibTex
+    return _import_entries(_entries(bibtex, bibtexparser_customization, batch_size, skip_unchanged), batch_size)
+
+
+def _import_entries(chunks, batch_size):
+    '''
+    Validate and save entries parsed by bibtexparser, see L{import_bibtex_batches}.
+
+    @type  chunks: iterable
+    @param chunks: the entries, the hash of the records by key and the number of records left out, of each chunk
+
+    @rtype: generator
+    @return: the L{ImportBatch} of each batch
+    '''
     # container for error messages
     errors = []
 
-    # publication types
-    types = Type.objects.all()
+    # publication types, reloaded once per import as they may have been changed by another process
+    type_registry.cache_clear()
 
     integer_keys = [
             'volume',
             'number',
             'year']
 
-    saved_publications = []
+    # validated publications, saved once a batch is complete
+    pending = []
+
+    # number of records left out since the last batch
+    skipped = 0
 
     # try adding publications
-    for entry in bib:
+    for entry, source_hash, chunk_skipped in _hashed_entries(chunks):
+        skipped += chunk_skipped
+        if entry is None:
+            # a chunk of unchanged entries
+            if len(pending) + skipped >= batch_size:
+                yield _save_publications(pending, errors, skipped)
+                pending = []
+                errors = []
+                skipped = 0
+            continue
+
         # first fix integers - 'year' needs to be checked
         # for int-ness in particular
         for key in integer_keys:
@@ -140,10 +549,9 @@ def import_bibtex(bibtex, bibtexparser_customization=None):
             type_id = None
 
             reftype = entry.pop('ENTRYTYPE', '')
-            for t in types:
-                if reftype in t.bibtex_type_list:
-                    type_id = t.id
-                    break
+            publication_type = type_registry().by_bibtex_type.get(reftype)
+            if publication_type is not None:
+                type_id = publication_type.id
 
             if type_id is None:
                 errors.append('Type "{}" unknown.'.format(reftype))
@@ -208,30 +616,16 @@ def import_bibtex(bibtex, bibtexparser_customization=None):
                 )
 
             publication = Publication(**publication_data)
+            publication.normalize()
 
-            try:
-                converted_data = model_to_dict(publication,
-                                               exclude=['lists',
-                                                        'image',
-                                                        'pdf',
-                                                        'banner',
-                                                        'id',
-                                                        'citekey'])
-                publication = Publication.objects.get(**converted_data)
-                saved_publications.append(publication)
-            except Publication.DoesNotExist:
-                publication.citekey = citekey
-                with transaction.atomic():
-                    try:
-                        publication.save()
-                        saved_publications.append(publication)
-                    except Exception as e:
-                        # show error message
-                        key = publication.citekey
-                        if not key:
-                            key = '<unnamed>'
-                        errors.append('An error occurred saving '
-                                      'publication "%s": %s' % (key, e))
+            publication.citekey = citekey
+            publication.source_hash = source_hash
+            pending.append(publication)
+            if len(pending) + skipped >= batch_size:
+                yield _save_publications(pending, errors, skipped)
+                pending = []
+                errors = []
+                skipped = 0
 
         else:
             key = entry['id'] if 'id' in entry else '<unnamed>'
@@ -245,4 +639,6 @@ def import_bibtex(bibtex, bibtexparser_customization=None):
                           'keys: %s' % (key, ', '.join(missing_keys)))
             continue
 
-    return saved_publications, errors
+    if pending or errors or skipped:
+        yield _save_publications(pending, errors, skipped)
+
@@ -5,10 +5,26 @@ from string import capwords
 
 from django.shortcuts import render
 
+from ..cache import cache_page
 from ..models import Type, Publication
-from ..utils import populate
+from ..utils import export, populate, publications_condition
 
 
+def _publications(request, name):
+    # split into forename, middlenames and surname
+    names = name.replace(' ', '+').split('+')
+
+    # simplified/normalized representation of the author name, as stored in the author index
+    if len(names) > 1:
+        name_simple = Publication.simplify_name(names[0][0] + '. ' + names[-1])
+    else:
+        name_simple = Publication.simplify_name(names[-1].lower())
+
+    return Publication.objects.filter(author__name_simple=name_simple).distinct()
+
+
+@publications_condition(_publications)
+@cache_page
 def by_author(request, name):
     fullname = capwords(name.replace('+', ' '))
     fullname = fullname.replace(' Von ', ' von ').replace(' Van ', ' van ')
@@ -22,63 +38,30 @@ def by_author(request, name):
             fullname = fullname[:off] + fullname[off].upper() + fullname[off + 1:]
         off = fullname.find('-', off)
 
-    # split into forename, middlenames and surname
-    names = name.replace(' ', '+').split('+')
-
-    # construct a liberal query
-    surname = names[-1]
-    surname = surname.replace(u'ä', u'%%')
-    surname = surname.replace(u'ae', u'%%')
-    surname = surname.replace(u'ö', u'%%')
-    surname = surname.replace(u'oe', u'%%')
-    surname = surname.replace(u'ü', u'%%')
-    surname = surname.replace(u'ue', u'%%')
-    surname = surname.replace(u'ß', u'%%')
-    surname = surname.replace(u'ss', u'%%')
-
-    query_str = u'SELECT * FROM {table} ' \
-                'WHERE lower({table}.authors) LIKE lower(\'%%{surname}%%\') ' \
-                'ORDER BY {table}.year DESC, {table}.month DESC, {table}.id DESC'
-    query = Publication.objects.raw(query_str.format(table=Publication._meta.db_table, surname=surname))
-
     # find publications of this author
-    publications = []
-    publications_by_type = defaultdict(lambda: [])
-
-    # further filter results
-    if len(names) > 1:
-        name_simple = Publication.simplify_name(names[0][0] + '. ' + names[-1])
-        for publication in query:
-            if name_simple in publication.authors_list_simple:
-                publications.append(publication)
-                publications_by_type[publication.type_id].append(publication)
-
-    elif len(names) > 0:
-        for publication in query:
-            if Publication.simplify_name(names[-1].lower()) in publication.authors_list_simple:
-                publications.append(publication)
-                publications_by_type[publication.type_id].append(publication)
-
-    # attach publications to types
-    types = Type.objects.filter(id__in=publications_by_type.keys())
-    for t in types:
-        t.publications = publications_by_type[t.id]
+    publications = _publications(request, name)
 
     if 'plain' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
-                      content_type='text/plain; charset=UTF-8')
+        return export(request, publications, 'plain')
 
     if 'bibtex' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
-                      content_type='text/x-bibtex; charset=UTF-8')
+        return export(request, publications, 'bibtex')
 
     if 'mods' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
-                      content_type='application/xml; charset=UTF-8')
+        return export(request, publications, 'mods')
 
     if 'ris' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
-                      content_type='application/x-research-info-systems; charset=UTF-8')
+        return export(request, publications, 'ris')
+
+    publications = list(publications)
+    publications_by_type = defaultdict(lambda: [])
+    for publication in publications:
+        publications_by_type[publication.type_id].append(publication)
+
+    # attach publications to types
+    types = Type.objects.filter(id__in=publications_by_type.keys())
+    for t in types:
+        t.publications = publications_by_type[t.id]
 
     if 'rss' in request.GET:
         return render(request, 'publications_bootstrap/export/publications.rss',
@@ -2,32 +2,35 @@
 
 from django.shortcuts import render
 
-from ..models import Catalog
-from ..utils import populate
+from ..cache import cache_page
+from ..models import Catalog, Publication
+from ..utils import export, populate, publications_condition
 
 
+def _publications(request, title):
+    return Publication.objects.filter(catalog__title_lower=title.lower())
+
+
+@publications_condition(_publications)
+@cache_page
 def for_catalog(request, title):
     try:
-        catalog = Catalog.objects.get(title__iexact=title)
+        catalog = Catalog.objects.get(title_lower=title.lower())
 
         publications = catalog.publications.all()
         publications = publications.order_by('-year', '-month', '-id')
 
         if 'plain' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
-                          content_type='text/plain; charset=UTF-8')
+            return export(request, publications, 'plain')
 
         if 'bibtex' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
-                          content_type='text/x-bibtex; charset=UTF-8')
+            return export(request, publications, 'bibtex')
 
         if 'mods' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
-                          content_type='application/xml; charset=UTF-8')
+            return export(request, publications, 'mods')
 
         if 'ris' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
-                          content_type='application/x-research-info-systems; charset=UTF-8')
+            return export(request, publications, 'ris')
 
         if 'rss' in request.GET:
             return render(request, 'publications_bootstrap/export/publications.rss', {
@@ -2,28 +2,32 @@
 
 from django.shortcuts import render
 
+from ..cache import cache_page
 from ..models import Publication
+from ..utils import export, publications_condition
 
 
+def _publications(request, publication_id):
+    return Publication.objects.filter(pk=publication_id)
+
+
+@publications_condition(_publications)
+@cache_page
 def by_id(request, publication_id):
     try:
         publication = Publication.objects.get(pk=publication_id)
 
         if 'plain' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.txt', {'publications': [publication]},
-                          content_type='text/plain; charset=UTF-8')
+            return export(request, [publication], 'plain')
 
         if 'bibtex' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.bib', {'publications': [publication]},
-                          content_type='text/x-bibtex; charset=UTF-8')
+            return export(request, [publication], 'bibtex')
 
         if 'mods' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.mods', {'publications': [publication]},
-                          content_type='application/xml; charset=UTF-8')
+            return export(request, [publication], 'mods')
 
         if 'ris' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.ris', {'publications': [publication]},
-                          content_type='application/x-research-info-systems; charset=UTF-8')
+            return export(request, [publication], 'ris')
 
         publication.links = publication.publicationlink_set.all()
         publication.files = publication.publicationfile_set.all()
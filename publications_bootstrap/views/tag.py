@@ -1,40 +1,41 @@
 # -*- coding: utf-8 -*-
 
 from django.shortcuts import render
+from django.utils.http import urlunquote_plus
 
+from ..cache import cache_page
 from ..models import Publication
-from ..utils import populate
+from ..utils import export, populate, publications_condition
 
 
-def by_tag(request, tag):
-    tag = tag.lower().replace(' ', '+')
-    candidates = Publication.objects.filter(tags__icontains=tag.split('+')[0], external=False)
-    publications = []
+def _publications(request, tag):
+    # the tags are quoted in the links, such that a plus in a tag is not read as a space
+    return Publication.objects.filter(tag__name=urlunquote_plus(tag).lower(), external=False)
+
 
-    for i, publication in enumerate(candidates):
-        if tag in [k[1] for k in publication.tags_escaped()]:
-            publications.append(publication)
+@publications_condition(_publications)
+@cache_page
+def by_tag(request, tag):
+    publications = _publications(request, tag)
+    tag = urlunquote_plus(tag).lower()
 
     if 'plain' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
-                      content_type='text/plain; charset=UTF-8')
+        return export(request, publications, 'plain')
 
     if 'bibtex' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
-                      content_type='text/x-bibtex; charset=UTF-8')
+        return export(request, publications, 'bibtex')
 
     if 'mods' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
-                      content_type='application/xml; charset=UTF-8')
+        return export(request, publications, 'mods')
 
     if 'ris' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
-                      content_type='application/x-research-info-systems; charset=UTF-8')
+        return export(request, publications, 'ris')
 
     # load custom links and files
+    publications = list(publications)
     populate(publications)
 
     return render(request, 'publications_bootstrap/pages/tag.html', {
         'publications': publications,
-        'tag': tag.replace('+', ' '),
-        'title': "publications for tag {}".format(tag.replace('+', ' '))})
+        'tag': tag,
+        'title': "publications for tag {}".format(tag)})
@@ -16,7 +16,13 @@ def by_unapi(request):
 
     if format is not None:
         try:
-            publications = Publication.objects.filter(pk=int(id))
+            if not id:
+                raise ValueError
+            if id.isdigit():
+                publications = Publication.objects.filter(pk=int(id))
+            else:
+                # citekeys are also accepted as ids
+                publications = Publication.objects.filter(citekey_lower=id.lower())
 
             if not publications:
                 raise ValueError
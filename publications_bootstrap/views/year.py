@@ -1,55 +1,92 @@
 # -*- coding: utf-8 -*-
 
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import render
 
+from ..apps import PublicationsBootstrapConfig
+from ..cache import cache_page
 from ..models import Publication
-from ..utils import populate
+from ..utils import export, populate, publications_condition
 
+DEFAULT_PAGE_SIZE = 100
 
-def by_year(request, year=None):
-    years = []
-    publications = Publication.objects.select_related()
-    if year:
-        publications = publications.filter(year=year, external=False)
+
+def _cursor(publication):
+    """
+    Position of a publication in the listing, as (year, month, id).
+    """
+    return '{}-{}-{}'.format(publication.year, publication.month.value if publication.month else '', publication.id)
+
+
+def _after(cursor):
+    """
+    Filter for the publications listed after the given cursor, in the order (-year, -month, -id).
+    """
+    try:
+        year, month, id = cursor.split('-')
+        year, month, id = int(year), int(month) if month else None, int(id)
+    except ValueError:
+        raise Http404
+
+    # on some backends (e.g. PostgreSQL), NULL is larger than any month and listed first in descending order
+    nulls_first = connection.features.nulls_order_largest
+    if month is None:
+        same_month = Q(month__isnull=True, id__lt=id)
+        after_month = Q(month__isnull=False) if nulls_first else Q(pk__in=[])
     else:
-        publications = publications.filter(external=False)
-    publications = publications.order_by('-year', '-month', '-id')
+        same_month = Q(month=month, id__lt=id)
+        after_month = Q(month__lt=month) if nulls_first else Q(month__lt=month) | Q(month__isnull=True)
+    return Q(year__lt=year) | Q(year=year) & (after_month | same_month)
 
-    for publication in publications:
-        if publication.type.hidden:
-            continue
-        if not years or (years[-1][0] != publication.year):
-            years.append((publication.year, []))
-        years[-1][1].append(publication)
+
+def _publications(request, year=None):
+    publications = Publication.objects.filter(external=False, type__hidden=False)
+    if year:
+        publications = publications.filter(year=year)
+    return publications
+
+
+@publications_condition(_publications)
+@cache_page
+def by_year(request, year=None):
+    publications = _publications(request, year).select_related('type').order_by('-year', '-month', '-id')
 
     if 'plain' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.txt',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='text/plain; charset=UTF-8')
+        return export(request, publications, 'plain')
 
     if 'bibtex' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.bib',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='text/x-bibtex; charset=UTF-8')
+        return export(request, publications, 'bibtex')
 
     if 'mods' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.mods',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='application/xml; charset=UTF-8')
+        return export(request, publications, 'mods')
 
     if 'ris' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.ris',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='application/x-research-info-systems; charset=UTF-8')
+        return export(request, publications, 'ris')
 
     if 'rss' in request.GET:
         return render(request, 'publications_bootstrap/export/publications.rss',
                       {'url': 'http://' + request.get_host() + request.path,
-                       'publications': sum([y[1] for y in years], [])},
+                       'publications': list(publications)},
                       content_type='application/rss+xml; charset=UTF-8')
 
+    # keyset pagination, the page is the only evaluation of the queryset
+    page_size = max(int(PublicationsBootstrapConfig.defaults.get('page_size', DEFAULT_PAGE_SIZE)), 1)
+    if request.GET.get('after'):
+        publications = publications.filter(_after(request.GET['after']))
+    publications = list(publications[:page_size + 1])
+    next_cursor = _cursor(publications[page_size - 1]) if len(publications) > page_size else None
+    publications = publications[:page_size]
+
+    years = [(y, list(p)) for y, p in groupby(publications, key=attrgetter('year'))]
+
     # load custom links and files
     populate(publications)
 
     return render(request, 'publications_bootstrap/pages/years.html', {'publications': publications,
-                                                                       'years': years})
+                                                                       'years': years,
+                                                                       'next': next_cursor})